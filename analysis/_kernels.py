@@ -0,0 +1,43 @@
+"""
+Compiled aggregation kernels for very large trace files.
+
+Numba is an optional dependency; when it is not installed HAVE_NUMBA is
+False and the analyzer keeps using its pandas groupby path.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange, get_num_threads
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+# Columns of the array returned by agg_per_type
+N_TX, N_RX, BYTES_TX, BYTES_RX = range(4)
+
+if HAVE_NUMBA:
+    @njit(parallel=True, cache=True)
+    def _agg_per_type(packet_type, is_tx, size, ntypes, nchunks):
+        n = packet_type.size
+        step = (n + nchunks - 1) // nchunks
+        # One partial table per thread so the parallel loop never races on a row
+        partial = np.zeros((nchunks, ntypes, 4))
+        for c in prange(nchunks):
+            for i in range(c * step, min(n, (c + 1) * step)):
+                k = packet_type[i]
+                if k < 0:
+                    continue
+                if is_tx[i]:
+                    partial[c, k, N_TX] += 1
+                    partial[c, k, BYTES_TX] += size[i]
+                else:
+                    partial[c, k, N_RX] += 1
+                    partial[c, k, BYTES_RX] += size[i]
+        return partial.sum(axis=0)
+
+    def agg_per_type(packet_type, is_tx, size, ntypes):
+        """Count packets and sum bytes per packet type code for transmit/receive events."""
+        return _agg_per_type(packet_type, is_tx, size, ntypes, get_num_threads())
+else:
+    agg_per_type = None
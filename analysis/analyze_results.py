@@ -2,210 +2,366 @@
 
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # plots are only saved to files
 import matplotlib.pyplot as plt
-import seaborn as sns
 from pathlib import Path
-import re
+import io
+from functools import cached_property
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Tuple
+try:
+    from ._kernels import HAVE_NUMBA, agg_per_type, N_TX, N_RX, BYTES_TX, BYTES_RX
+except ImportError:
+    # Run as a script (python analysis/analyze_results.py), not as a package module
+    from _kernels import HAVE_NUMBA, agg_per_type, N_TX, N_RX, BYTES_TX, BYTES_RX
+
+try:
+    import polars as pl
+    HAVE_POLARS = True
+except ImportError:
+    HAVE_POLARS = False
+
+# Attack markers that may appear in the trace flags column, and their bit in
+# the flags bitmask (traces may carry either the names or the integer mask)
+ATTACK_BITS = {'BLACKHOLE': 1, 'SYBIL': 2, 'REPLAY': 4}
+
+TRACE_COLUMNS = ['event', 'time', 'node', 'x', 'y', 'z', 'packet_type', 'size', 'flags', 'packet_id']
+TRACE_DTYPES = {'time': 'float64', 'node': 'int32', 'x': 'float32', 'y': 'float32', 'z': 'float32', 'size': 'int32'}
+
+# Above this many rows the per-type aggregate uses the compiled kernel (if Numba is installed)
+NUMBA_MIN_ROWS = 10_000_000
 
 class VanetAnalyzer:
+    # Per-instance caches derived from self.data
+    _CACHED_ATTRS = ('_per_type_stats', '_deliveries', 'delays', 'pdrs', 'overhead', 'attacks')
+
     def __init__(self, trace_file: str):
         self.trace_file = Path(trace_file)
         self.data = self._load_trace_file()
+    
+    @property
+    def data(self) -> pd.DataFrame:
+        return self._data
+    
+    @data.setter
+    def data(self, value: pd.DataFrame):
+        # Replacing the trace invalidates every cached metric
+        self._data = value
+        for attr in self._CACHED_ATTRS:
+            self.__dict__.pop(attr, None)
         
     def _load_trace_file(self) -> pd.DataFrame:
         """Load and parse NS-3 trace file."""
-        columns = ['event', 'time', 'node', 'x', 'y', 'z', 'packet_type', 'size', 'flags']
-        data = []
+        df = None
+        if HAVE_POLARS:
+            try:
+                df = self._read_trace_polars()
+            except pl.exceptions.PolarsError:
+                pass
+        if df is None:
+            try:
+                df = self._read_trace_csv()
+            except (ValueError, pd.errors.ParserError):
+                # Some t/r lines don't follow the expected layout; parse line by line
+                # and skip the ones that can't be typed
+                df = self._read_trace_lines()
+        
+        df['event'] = df['event'].cat.remove_unused_categories()
+        df['packet_type'] = df['packet_type'].cat.remove_unused_categories()
+        df['flags'] = self._encode_flags(df['flags'])
+        
+        if df['packet_id'].isna().all():
+            # No sequence field in the trace: pair the k-th transmission of a
+            # packet type/size with its k-th reception
+            df['packet_id'] = df.groupby(['event', 'packet_type', 'size'], observed=True).cumcount()
+        return df
+    
+    @staticmethod
+    def _encode_flags(flags: pd.Series) -> pd.Series:
+        """Convert the flags column to a uint8 attack bitmask."""
+        flags = flags.fillna('').astype('category')
+        labels = flags.cat.categories.astype(str)
+        
+        # Only the distinct flag strings are inspected; rows pick up their mask
+        # through the category codes (code -1, i.e. missing, maps to the last slot)
+        masks = np.zeros(len(labels) + 1, dtype=np.uint8)
+        numeric = pd.to_numeric(labels, errors='coerce')
+        is_numeric = ~np.isnan(numeric)
+        masks[:-1][is_numeric] = numeric[is_numeric].astype(np.uint8)
+        for name, bit in ATTACK_BITS.items():
+            masks[:-1] |= np.where(labels.str.contains(name, regex=False), bit, 0).astype(np.uint8)
+        return pd.Series(masks[flags.cat.codes.to_numpy()], index=flags.index, name='flags')
+    
+    def _read_trace_csv(self) -> pd.DataFrame:
+        """Parse the trace with pandas' C reader."""
+        df = pd.read_csv(
+            self.trace_file,
+            sep=r'\s+',
+            engine='c',
+            header=None,
+            names=TRACE_COLUMNS,
+            dtype={'event': 'category', 'packet_type': 'category', 'flags': 'object', 'packet_id': 'object'},
+            on_bad_lines='skip',
+        )
         
-        with open(self.trace_file) as f:
+        # Keep transmission / reception events only; other trace lines may not be
+        # numeric in every column, so numeric dtypes are enforced after filtering
+        return df[df['event'].isin(['t', 'r'])].astype(TRACE_DTYPES)
+    
+    def _read_trace_polars(self) -> pd.DataFrame:
+        """Parse the trace with Polars' multi-threaded reader."""
+        numeric = [pl.col(column).cast(getattr(pl, dtype.capitalize()), strict=False)
+                   for column, dtype in TRACE_DTYPES.items()]
+        # Read whole lines and split them on whitespace runs ourselves, like the
+        # other parsers: a fixed single-space separator breaks on trailing or
+        # repeated spaces and on tabs
+        fields = (
+            pl.col('line')
+            .str.replace_all(r'\s+', ' ')
+            .str.strip_chars(' ')
+            .str.split_exact(' ', len(TRACE_COLUMNS) - 1)
+            .struct.rename_fields(TRACE_COLUMNS)
+        )
+        df = (
+            pl.scan_csv(
+                self.trace_file,
+                separator='\x1f',
+                has_header=False,
+                quote_char=None,
+                schema={'line': pl.Utf8},
+                truncate_ragged_lines=True,
+            )
+            .select(fields.alias('fields'))
+            .unnest('fields')
+            .filter(pl.col('event').is_in(['t', 'r']))
+            .with_columns(numeric)
+            # Lines that can't be typed come out null and are skipped
+            .drop_nulls(list(TRACE_DTYPES))
+            .collect()
+        )
+        return df.to_pandas().astype({'event': 'category', 'packet_type': 'category'})
+    
+    def _read_trace_lines(self) -> pd.DataFrame:
+        """Parse the trace line by line, skipping lines that can't be typed."""
+        rows = []
+        with open(self.trace_file, 'rb') as f:
             for line in f:
-                if line.startswith('t'):  # Transmission event
-                    parts = line.strip().split()
-                    data.append({
-                        'event': parts[0],
-                        'time': float(parts[1]),
-                        'node': int(parts[2]),
-                        'x': float(parts[3]),
-                        'y': float(parts[4]),
-                        'z': float(parts[5]),
-                        'packet_type': parts[6],
-                        'size': int(parts[7]),
-                        'flags': parts[8] if len(parts) > 8 else ''
-                    })
-        
-        return pd.DataFrame(data)
+                if line[:1] not in (b't', b'r'):
+                    continue
+                parts = line.split()
+                if parts[0] not in (b't', b'r'):
+                    continue
+                try:
+                    # float()/int() accept the raw bytes; only string fields are decoded
+                    rows.append((
+                        parts[0].decode(),
+                        float(parts[1]),
+                        int(parts[2]),
+                        float(parts[3]),
+                        float(parts[4]),
+                        float(parts[5]),
+                        parts[6].decode(),
+                        int(parts[7]),
+                        parts[8].decode() if len(parts) > 8 else '',
+                        parts[9].decode() if len(parts) > 9 else None,
+                    ))
+                except (IndexError, ValueError):
+                    continue
+        
+        df = pd.DataFrame(rows, columns=TRACE_COLUMNS)
+        return df.astype({'event': 'category', 'packet_type': 'category', **TRACE_DTYPES})
     
+    @cached_property
+    def _per_type_stats(self) -> pd.DataFrame:
+        """Aggregate packet count and bytes per packet type and event in one pass."""
+        if HAVE_NUMBA and len(self.data) >= NUMBA_MIN_ROWS:
+            return self._per_type_stats_compiled()
+        
+        agg = (
+            self.data.groupby(['packet_type', 'event'], sort=False, observed=True)
+            .agg(n=('time', 'size'), bytes=('size', 'sum'))
+            .unstack('event')
+        )
+        # Make sure both transmit and receive columns exist even if one event type is absent
+        return agg.reindex(columns=pd.MultiIndex.from_product([['n', 'bytes'], ['t', 'r']]))
+
+    def _per_type_stats_compiled(self) -> pd.DataFrame:
+        """Same aggregate as _per_type_stats, computed by the parallel Numba kernel."""
+        packet_type = self.data['packet_type']
+        codes = packet_type.cat.codes.to_numpy()
+        is_tx = (self.data['event'] == 't').to_numpy()
+        totals = agg_per_type(codes, is_tx, self.data['size'].to_numpy(), len(packet_type.cat.categories))
+        
+        # Match the groupby output: packet types in order of appearance, NaN for absent events
+        order = pd.unique(codes[codes >= 0])
+        totals = totals[order]
+        counts = np.where(totals[:, [N_TX, N_RX]] > 0, totals[:, [N_TX, N_RX]], np.nan)
+        return pd.DataFrame(
+            np.column_stack([counts, totals[:, [BYTES_TX, BYTES_RX]]]),
+            index=pd.Index(packet_type.cat.categories[order], name='packet_type'),
+            columns=pd.MultiIndex.from_product([['n', 'bytes'], ['t', 'r']]),
+        )
+
+    @cached_property
+    def _deliveries(self) -> pd.DataFrame:
+        """Join every transmission with its receptions on the packet identifier."""
+        keys = ['packet_type', 'size', 'packet_id']
+        # Only t/r events are loaded, so one mask splits the trace in two
+        is_tx = (self.data['event'] == 't').to_numpy()
+        columns = self.data[keys + ['time']]
+        sent = columns[is_tx]
+        received = columns[~is_tx]
+        return sent.merge(received, on=keys, suffixes=('_s', '_r'))
+
     def calculate_end_to_end_delay(self) -> Dict[str, float]:
         """Calculate average end-to-end delay for different packet types."""
-        delays = {}
-        
-        # Group by packet type and calculate delays
-        for packet_type in self.data['packet_type'].unique():
-            packets = self.data[self.data['packet_type'] == packet_type]
-            sent = packets[packets['event'] == 't']
-            received = packets[packets['event'] == 'r']
-            
-            if not sent.empty and not received.empty:
-                delay = (received['time'] - sent['time']).mean()
-                delays[packet_type] = delay
+        deliveries = self._deliveries
+        delay = deliveries['time_r'] - deliveries['time_s']
+        return delay.groupby(deliveries['packet_type'], sort=False, observed=True).mean().to_dict()
+
+    def calculate_interval_delay(self, interval: float = 1.0) -> pd.Series:
+        """Calculate average end-to-end delay of packets received in each time interval."""
+        deliveries = self._deliveries
+        if deliveries.empty:
+            return pd.Series(dtype='float64')
         
-        return delays
+        bins = np.arange(0.0, deliveries['time_r'].max() + interval, interval)
+        delay = deliveries['time_r'] - deliveries['time_s']
+        return delay.groupby(pd.cut(deliveries['time_r'], bins, right=False), observed=True).mean()
     
     def calculate_packet_delivery_ratio(self) -> Dict[str, float]:
         """Calculate packet delivery ratio for different packet types."""
-        pdrs = {}
-        
-        for packet_type in self.data['packet_type'].unique():
-            packets = self.data[self.data['packet_type'] == packet_type]
-            sent = len(packets[packets['event'] == 't'])
-            received = len(packets[packets['event'] == 'r'])
-            
-            if sent > 0:
-                pdrs[packet_type] = received / sent
-            else:
-                pdrs[packet_type] = 0.0
-        
-        return pdrs
+        counts = self._per_type_stats['n']
+        return (counts['r'].fillna(0) / counts['t']).fillna(0.0).to_dict()
     
     def calculate_overhead(self) -> Dict[str, int]:
         """Calculate communication overhead in bytes."""
-        overhead = {}
-        
-        for packet_type in self.data['packet_type'].unique():
-            packets = self.data[self.data['packet_type'] == packet_type]
-            total_bytes = packets['size'].sum()
-            overhead[packet_type] = total_bytes
-        
-        return overhead
+        return self._per_type_stats['bytes'].sum(axis=1).astype('int64').to_dict()
     
     def analyze_attack_effectiveness(self) -> Dict[str, float]:
         """Analyze the effectiveness of different attacks."""
-        attacks = {}
-        
-        # Analyze black hole attacks
-        blackhole = self.data[self.data['flags'].str.contains('BLACKHOLE', na=False)]
-        if not blackhole.empty:
-            attacks['blackhole'] = len(blackhole[blackhole['event'] == 'r']) / len(blackhole)
-        
-        # Analyze Sybil attacks
-        sybil = self.data[self.data['flags'].str.contains('SYBIL', na=False)]
-        if not sybil.empty:
-            attacks['sybil'] = len(sybil[sybil['event'] == 'r']) / len(sybil)
+        flags = self.data['flags'].to_numpy()
+        received = (self.data['event'] == 'r').to_numpy()
         
-        # Analyze replay attacks
-        replay = self.data[self.data['flags'].str.contains('REPLAY', na=False)]
-        if not replay.empty:
-            attacks['replay'] = len(replay[replay['event'] == 'r']) / len(replay)
-        
-        return attacks
+        results = {}
+        for attack, bit in ATTACK_BITS.items():
+            mask = (flags & bit) != 0
+            if mask.any():
+                results[attack.lower()] = float(received[mask].mean())
+        return results
+    
+    @cached_property
+    def delays(self) -> Dict[str, float]:
+        return self.calculate_end_to_end_delay()
+    
+    @cached_property
+    def pdrs(self) -> Dict[str, float]:
+        return self.calculate_packet_delivery_ratio()
+    
+    @cached_property
+    def overhead(self) -> Dict[str, int]:
+        return self.calculate_overhead()
+    
+    @cached_property
+    def attacks(self) -> Dict[str, float]:
+        return self.analyze_attack_effectiveness()
     
     def plot_results(self, output_dir: str):
         """Generate plots for various metrics."""
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        # Plot end-to-end delay
-        delays = self.calculate_end_to_end_delay()
-        plt.figure(figsize=(10, 6))
-        plt.bar(delays.keys(), delays.values())
-        plt.title('Average End-to-End Delay by Packet Type')
-        plt.xlabel('Packet Type')
-        plt.ylabel('Delay (seconds)')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig(output_dir / 'end_to_end_delay.png')
-        plt.close()
-        
-        # Plot packet delivery ratio
-        pdrs = self.calculate_packet_delivery_ratio()
-        plt.figure(figsize=(10, 6))
-        plt.bar(pdrs.keys(), pdrs.values())
-        plt.title('Packet Delivery Ratio by Packet Type')
-        plt.xlabel('Packet Type')
-        plt.ylabel('PDR')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig(output_dir / 'packet_delivery_ratio.png')
-        plt.close()
-        
-        # Plot communication overhead
-        overhead = self.calculate_overhead()
-        plt.figure(figsize=(10, 6))
-        plt.bar(overhead.keys(), overhead.values())
-        plt.title('Communication Overhead by Packet Type')
-        plt.xlabel('Packet Type')
-        plt.ylabel('Total Bytes')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig(output_dir / 'communication_overhead.png')
-        plt.close()
-        
-        # Plot attack effectiveness
-        attacks = self.analyze_attack_effectiveness()
-        if attacks:
-            plt.figure(figsize=(10, 6))
-            plt.bar(attacks.keys(), attacks.values())
-            plt.title('Attack Detection Effectiveness')
-            plt.xlabel('Attack Type')
-            plt.ylabel('Detection Rate')
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            plt.savefig(output_dir / 'attack_effectiveness.png')
-            plt.close()
+        # (values, title, x label, y label, file name)
+        plots = [
+            (self.delays, 'Average End-to-End Delay by Packet Type', 'Packet Type', 'Delay (seconds)',
+             'end_to_end_delay.png'),
+            (self.pdrs, 'Packet Delivery Ratio by Packet Type', 'Packet Type', 'PDR',
+             'packet_delivery_ratio.png'),
+            (self.overhead, 'Communication Overhead by Packet Type', 'Packet Type', 'Total Bytes',
+             'communication_overhead.png'),
+        ]
+        if self.attacks:
+            plots.append((self.attacks, 'Attack Detection Effectiveness', 'Attack Type', 'Detection Rate',
+                          'attack_effectiveness.png'))
+        
+        # Reuse a single figure/canvas for every chart
+        fig, ax = plt.subplots(figsize=(10, 6))
+        for values, title, xlabel, ylabel, filename in plots:
+            ax.clear()
+            ax.bar(list(values.keys()), list(values.values()))
+            ax.set_title(title)
+            ax.set_xlabel(xlabel)
+            ax.set_ylabel(ylabel)
+            ax.tick_params(axis='x', labelrotation=45)
+            fig.tight_layout()
+            fig.savefig(output_dir / filename, dpi=80)
+        plt.close(fig)
     
     def generate_report(self, output_file: str):
         """Generate a comprehensive analysis report."""
-        delays = self.calculate_end_to_end_delay()
-        pdrs = self.calculate_packet_delivery_ratio()
-        overhead = self.calculate_overhead()
-        attacks = self.analyze_attack_effectiveness()
-        
-        with open(output_file, 'w') as f:
-            f.write("VANET Secure Routing Protocol Analysis Report\n")
-            f.write("===========================================\n\n")
-            
-            f.write("1. End-to-End Delay\n")
-            f.write("-----------------\n")
-            for packet_type, delay in delays.items():
-                f.write(f"{packet_type}: {delay:.3f} seconds\n")
-            f.write("\n")
-            
-            f.write("2. Packet Delivery Ratio\n")
-            f.write("----------------------\n")
-            for packet_type, pdr in pdrs.items():
-                f.write(f"{packet_type}: {pdr:.2%}\n")
-            f.write("\n")
-            
-            f.write("3. Communication Overhead\n")
-            f.write("------------------------\n")
-            for packet_type, bytes_sent in overhead.items():
-                f.write(f"{packet_type}: {bytes_sent:,} bytes\n")
-            f.write("\n")
-            
-            if attacks:
-                f.write("4. Attack Detection Effectiveness\n")
-                f.write("-------------------------------\n")
-                for attack_type, effectiveness in attacks.items():
-                    f.write(f"{attack_type}: {effectiveness:.2%}\n")
-                f.write("\n")
-            
-            f.write("5. Summary\n")
-            f.write("---------\n")
-            f.write(f"Average PDR across all packet types: {np.mean(list(pdrs.values())):.2%}\n")
-            f.write(f"Average delay across all packet types: {np.mean(list(delays.values())):.3f} seconds\n")
-            f.write(f"Total communication overhead: {sum(overhead.values()):,} bytes\n")
-            if attacks:
-                f.write(f"Average attack detection rate: {np.mean(list(attacks.values())):.2%}\n")
+        delays = self.delays
+        pdrs = self.pdrs
+        overhead = self.overhead
+        attacks = self.attacks
+        
+        def section(title: str, underline: str, lines) -> str:
+            return f"{title}\n{underline}\n" + "".join(f"{line}\n" for line in lines) + "\n"
+        
+        buf = io.StringIO()
+        w = buf.write
+        w("VANET Secure Routing Protocol Analysis Report\n")
+        w("===========================================\n\n")
+        w(section("1. End-to-End Delay", "-----------------",
+                  (f"{packet_type}: {delay:.3f} seconds" for packet_type, delay in delays.items())))
+        w(section("2. Packet Delivery Ratio", "----------------------",
+                  (f"{packet_type}: {pdr:.2%}" for packet_type, pdr in pdrs.items())))
+        w(section("3. Communication Overhead", "------------------------",
+                  (f"{packet_type}: {bytes_sent:,} bytes" for packet_type, bytes_sent in overhead.items())))
+        if attacks:
+            w(section("4. Attack Detection Effectiveness", "-------------------------------",
+                      (f"{attack_type}: {effectiveness:.2%}" for attack_type, effectiveness in attacks.items())))
+        
+        w("5. Summary\n")
+        w("---------\n")
+        w(f"Average PDR across all packet types: {np.mean(list(pdrs.values())):.2%}\n")
+        w(f"Average delay across all packet types: {np.mean(list(delays.values())):.3f} seconds\n")
+        w(f"Total communication overhead: {sum(overhead.values()):,} bytes\n")
+        if attacks:
+            w(f"Average attack detection rate: {np.mean(list(attacks.values())):.2%}\n")
+        
+        # Write the whole report at once
+        Path(output_file).write_text(buf.getvalue())
+
+def _analyze_one(trace_file: str, output_dir: str) -> Path:
+    """Analyze one trace, writing plots and report to a subdirectory named after it."""
+    output_dir = Path(output_dir) / Path(trace_file).stem
+    analyzer = VanetAnalyzer(trace_file)
+    analyzer.plot_results(output_dir)
+    analyzer.generate_report(output_dir / 'report.txt')
+    return output_dir
+
+def analyze_many(trace_files: List[str], output_dir: str) -> List[Path]:
+    """Analyze several trace files in parallel, one worker process per file."""
+    with ProcessPoolExecutor() as executor:
+        return list(executor.map(_analyze_one, trace_files, [output_dir] * len(trace_files)))
 
 def main():
     import argparse
     parser = argparse.ArgumentParser(description='Analyze VANET simulation results')
-    parser.add_argument('trace_file', help='Path to NS-3 trace file')
+    parser.add_argument('trace_file', nargs='?', help='Path to NS-3 trace file')
+    parser.add_argument('--inputs', nargs='+', metavar='TRACE_FILE',
+                        help='Analyze several trace files in parallel (results go to one subdirectory each)')
     parser.add_argument('--output-dir', default='results', help='Output directory for plots')
     parser.add_argument('--report-file', default='results/report.txt', help='Output file for analysis report')
     args = parser.parse_args()
     
+    if args.inputs:
+        analyze_many(args.inputs, args.output_dir)
+        return
+    if not args.trace_file:
+        parser.error('a trace file or --inputs is required')
+    
     analyzer = VanetAnalyzer(args.trace_file)
     analyzer.plot_results(args.output_dir)
     analyzer.generate_report(args.report_file)
@@ -1,10 +1,9 @@
 import streamlit as st
 import sys
 import os
-import json
-import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 import plotly.express as px
+from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
 
@@ -12,17 +11,106 @@ import numpy as np
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.simulation.vanet_sim import VANETSimulation, SimulationConfig
+from src.simulation._kernels import warm_up as warm_up_kernels
 
-# Set matplotlib style
-plt.style.use('dark_background')
+# Page styling, built once at import and sent as-is on every rerun
+CUSTOM_CSS = """
+<style>
+.stApp {
+    background-color: #000000;
+    color: #ffffff;
+}
+.stButton>button {
+    background-color: #00ff00;
+    color: #000000;
+    border: none;
+    padding: 10px 20px;
+    border-radius: 5px;
+    font-weight: bold;
+    transition: all 0.3s ease;
+}
+.stButton>button:hover {
+    background-color: #00cc00;
+    transform: translateY(-2px);
+    box-shadow: 0 4px 8px rgba(0,255,0,0.2);
+}
+.stSlider>div>div>div {
+    background-color: #00ff00;
+}
+.stTabs [data-baseweb="tab-list"] {
+    gap: 2px;
+}
+.stTabs [data-baseweb="tab"] {
+    background-color: #1a1a1a;
+    border-radius: 4px;
+    padding: 10px 16px;
+    color: #ffffff;
+}
+.stTabs [aria-selected="true"] {
+    background-color: #00ff00;
+    color: #000000;
+}
+.stMarkdown h1, .stMarkdown h2, .stMarkdown h3 {
+    color: #ffffff;
+}
+.stSuccess {
+    background-color: #1a1a1a;
+    border-color: #00ff00;
+    color: #00ff00;
+}
+.feature-box {
+    background-color: #1a1a1a;
+    border-radius: 10px;
+    padding: 20px;
+    margin: 10px 0;
+    border: 1px solid #00ff00;
+}
+.project-links {
+    display: flex;
+    gap: 20px;
+    margin: 20px 0;
+}
+.project-link {
+    background-color: #1a1a1a;
+    padding: 15px 25px;
+    border-radius: 8px;
+    text-decoration: none;
+    color: #00ff00;
+    border: 1px solid #00ff00;
+    transition: all 0.3s ease;
+}
+.project-link:hover {
+    background-color: #00ff00;
+    color: #000000;
+}
+</style>
+"""
 
-def create_comparative_analysis_section(simulation):
+@st.cache_resource(show_spinner=False)
+def _warm_up_kernels():
+    """Compile the simulation kernels once per process, before the first Start click."""
+    warm_up_kernels()
+
+_warm_up_kernels()
+
+@st.cache_data(show_spinner=False)
+def run_simulation(config: SimulationConfig) -> dict:
+    """Run a simulation and return the results the UI needs (cached per config)"""
+    simulation = VANETSimulation(config)
+    simulation.run()
+    
+    # Only plain, picklable data is cached, not the simulation object itself
+    return {
+        'stats': simulation.stats.as_dict(),
+        'positions': [(v.id, v.position.x, v.position.y, v.is_malicious)
+                      for v in simulation.vehicles.values()],
+        'report': simulation.generate_comparative_report_dict(),
+    }
+
+def create_comparative_analysis_section(report: dict):
     """Create the comparative analysis section in the Streamlit app"""
     st.header("📊 Comparative Analysis")
     
-    # Generate comparison report
-    report = json.loads(simulation.generate_comparative_report('json'))
-    
     # Display overall scores
     st.subheader("Overall System Scores")
     scores_df = pd.DataFrame({
@@ -56,18 +144,12 @@ def create_comparative_analysis_section(simulation):
     # Display radar chart for main metrics
     st.subheader("Main Metrics Comparison")
     main_metrics = ['security', 'performance', 'visualization', 'features', 'ux']
-    radar_data = []
-    
-    for system in report['systems']:
-        values = [report['systems'][system][metric] for metric in main_metrics]
-        radar_data.append({
-            'System': system,
-            'Metric': main_metrics,
-            'Value': values
-        })
-    
-    radar_df = pd.DataFrame(radar_data)
-    radar_df = radar_df.explode(['Metric', 'Value'])
+    radar_df = pd.DataFrame(
+        [(system, metric, values[metric])
+         for system, values in report['systems'].items()
+         for metric in main_metrics],
+        columns=['System', 'Metric', 'Value']
+    )
     
     fig = px.line_polar(radar_df, r='Value', theta='Metric', 
                        line_close=True, color='System',
@@ -116,8 +198,7 @@ def create_simulation_section():
                 communication_range=communication_range
             )
             
-            simulation = VANETSimulation(config)
-            simulation.run()
+            results = run_simulation(config)
             
             # Display simulation results
             st.subheader("Simulation Results")
@@ -126,68 +207,61 @@ def create_simulation_section():
             tab1, tab2, tab3 = st.tabs(["Performance Metrics", "Vehicle Movement", "Comparative Analysis"])
             
             with tab1:
-                # Performance metrics plots
-                fig, axes = plt.subplots(2, 2, figsize=(15, 12))
+                # Performance metrics plots, built from one frame of the per-tick stats
+                stats_df = pd.DataFrame(results['stats'])
+                stats_df['t'] = np.linspace(0, config.sim_time, len(stats_df), dtype='float32')
+                
+                fig = make_subplots(
+                    rows=2, cols=2,
+                    subplot_titles=('Packet Delivery Ratio', 'Message Statistics',
+                                    'Attack Statistics', 'Average Trust Scores')
+                )
                 
                 # Set colors for plots
                 colors = ['#00ff00', '#00ffff', '#ff0000', '#ffff00']
                 
-                # Packet Delivery Ratio
-                axes[0, 0].plot(np.linspace(0, config.sim_time, len(simulation.stats['packet_delivery_ratio'])),
-                              simulation.stats['packet_delivery_ratio'], color=colors[0])
-                axes[0, 0].set_title('Packet Delivery Ratio', color='#ffffff')
-                axes[0, 0].set_xlabel('Time (s)', color='#ffffff')
-                axes[0, 0].set_ylabel('PDR', color='#ffffff')
-                
-                # Message Statistics
-                axes[0, 1].plot(np.linspace(0, config.sim_time, len(simulation.stats['messages_sent'])),
-                              simulation.stats['messages_sent'], label='Sent', color=colors[1])
-                axes[0, 1].plot(np.linspace(0, config.sim_time, len(simulation.stats['messages_received'])),
-                              simulation.stats['messages_received'], label='Received', color=colors[2])
-                axes[0, 1].set_title('Message Statistics', color='#ffffff')
-                axes[0, 1].set_xlabel('Time (s)', color='#ffffff')
-                axes[0, 1].set_ylabel('Number of Messages', color='#ffffff')
-                axes[0, 1].legend()
+                # (stats key, legend name, color, row, col)
+                traces = [
+                    ('packet_delivery_ratio', 'PDR', colors[0], 1, 1),
+                    ('messages_sent', 'Sent', colors[1], 1, 2),
+                    ('messages_received', 'Received', colors[2], 1, 2),
+                    ('attacks_attempted', 'Attempted', colors[2], 2, 1),
+                    ('attacks_detected', 'Detected', colors[3], 2, 1),
+                    ('trust_scores', 'Trust Score', colors[0], 2, 2),
+                ]
+                for key, name, color, row, col in traces:
+                    fig.add_trace(
+                        go.Scattergl(x=stats_df['t'], y=stats_df[key], name=name, line=dict(color=color)),
+                        row=row, col=col
+                    )
                 
-                # Attack Statistics
-                axes[1, 0].plot(np.linspace(0, config.sim_time, len(simulation.stats['attacks_attempted'])),
-                              simulation.stats['attacks_attempted'], label='Attempted', color=colors[2])
-                axes[1, 0].plot(np.linspace(0, config.sim_time, len(simulation.stats['attacks_detected'])),
-                              simulation.stats['attacks_detected'], label='Detected', color=colors[3])
-                axes[1, 0].set_title('Attack Statistics', color='#ffffff')
-                axes[1, 0].set_xlabel('Time (s)', color='#ffffff')
-                axes[1, 0].set_ylabel('Number of Attacks', color='#ffffff')
-                axes[1, 0].legend()
-                
-                # Trust Scores
-                axes[1, 1].plot(np.linspace(0, config.sim_time, len(simulation.stats['trust_scores'])),
-                              simulation.stats['trust_scores'], color=colors[0])
-                axes[1, 1].set_title('Average Trust Scores', color='#ffffff')
-                axes[1, 1].set_xlabel('Time (s)', color='#ffffff')
-                axes[1, 1].set_ylabel('Trust Score', color='#ffffff')
-                
-                # Set background color for all subplots
-                for ax in axes.flat:
-                    ax.set_facecolor('#000000')
-                    ax.grid(True, linestyle='--', alpha=0.3)
-                
-                plt.tight_layout()
-                st.pyplot(fig)
+                for (row, col), label in zip([(1, 1), (1, 2), (2, 1), (2, 2)],
+                                             ['PDR', 'Number of Messages', 'Number of Attacks', 'Trust Score']):
+                    fig.update_yaxes(title_text=label, row=row, col=col)
+                fig.update_xaxes(title_text='Time (s)')
+                fig.update_xaxes(griddash='dash', gridcolor='rgba(255,255,255,0.3)')
+                fig.update_yaxes(griddash='dash', gridcolor='rgba(255,255,255,0.3)')
+                fig.update_layout(
+                    height=800,
+                    template='plotly_dark',
+                    plot_bgcolor='#000000',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(color='#ffffff')
+                )
+                st.plotly_chart(fig, use_container_width=True)
             
             with tab2:
                 # Vehicle movement visualization
                 st.subheader("Vehicle Movement")
                 # Create a scatter plot of vehicle positions
-                positions = []
-                for vehicle in simulation.vehicles.values():
-                    positions.append({
-                        'Vehicle ID': vehicle.id,
-                        'X': vehicle.position.x,
-                        'Y': vehicle.position.y,
-                        'Type': 'Malicious' if vehicle.is_malicious else 'Normal'
-                    })
+                vehicle_ids, xs, ys, malicious = zip(*results['positions'])
                 
-                positions_df = pd.DataFrame(positions)
+                positions_df = pd.DataFrame({
+                    'Vehicle ID': vehicle_ids,
+                    'X': np.asarray(xs, dtype='float32'),
+                    'Y': np.asarray(ys, dtype='float32'),
+                    'Type': np.where(malicious, 'Malicious', 'Normal')
+                })
                 fig = px.scatter(positions_df, x='X', y='Y', 
                                color='Type', hover_data=['Vehicle ID'],
                                title='Vehicle Positions',
@@ -202,7 +276,7 @@ def create_simulation_section():
             
             with tab3:
                 # Display comparative analysis
-                create_comparative_analysis_section(simulation)
+                create_comparative_analysis_section(results['report'])
 
 def main():
     st.set_page_config(
@@ -212,77 +286,7 @@ def main():
     )
     
     # Custom CSS
-    st.markdown("""
-        <style>
-        .stApp {
-            background-color: #000000;
-            color: #ffffff;
-        }
-        .stButton>button {
-            background-color: #00ff00;
-            color: #000000;
-            border: none;
-            padding: 10px 20px;
-            border-radius: 5px;
-            font-weight: bold;
-            transition: all 0.3s ease;
-        }
-        .stButton>button:hover {
-            background-color: #00cc00;
-            transform: translateY(-2px);
-            box-shadow: 0 4px 8px rgba(0,255,0,0.2);
-        }
-        .stSlider>div>div>div {
-            background-color: #00ff00;
-        }
-        .stTabs [data-baseweb="tab-list"] {
-            gap: 2px;
-        }
-        .stTabs [data-baseweb="tab"] {
-            background-color: #1a1a1a;
-            border-radius: 4px;
-            padding: 10px 16px;
-            color: #ffffff;
-        }
-        .stTabs [aria-selected="true"] {
-            background-color: #00ff00;
-            color: #000000;
-        }
-        .stMarkdown h1, .stMarkdown h2, .stMarkdown h3 {
-            color: #ffffff;
-        }
-        .stSuccess {
-            background-color: #1a1a1a;
-            border-color: #00ff00;
-            color: #00ff00;
-        }
-        .feature-box {
-            background-color: #1a1a1a;
-            border-radius: 10px;
-            padding: 20px;
-            margin: 10px 0;
-            border: 1px solid #00ff00;
-        }
-        .project-links {
-            display: flex;
-            gap: 20px;
-            margin: 20px 0;
-        }
-        .project-link {
-            background-color: #1a1a1a;
-            padding: 15px 25px;
-            border-radius: 8px;
-            text-decoration: none;
-            color: #00ff00;
-            border: 1px solid #00ff00;
-            transition: all 0.3s ease;
-        }
-        .project-link:hover {
-            background-color: #00ff00;
-            color: #000000;
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
     
     # Title and description
     st.title("🚗 VANET Guardian")
@@ -1,13 +1,64 @@
 import hashlib
+import hmac
+import logging
+import struct
 import time
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa, padding, ec
+from cryptography.hazmat.primitives.asymmetric import rsa, padding, ec, ed25519, x25519
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.serialization import Encoding, PrivateFormat, PublicFormat, NoEncryption
+from cryptography import x509
 from cryptography.exceptions import InvalidSignature
+from functools import lru_cache
 from dataclasses import dataclass
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple, Set, Deque
+from collections import deque
 import base64
 
+try:
+    import blake3
+    HAVE_BLAKE3 = True
+except ImportError:
+    HAVE_BLAKE3 = False
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_HISTORY = 10000  # Maximum number of messages to store per sender for replay prevention
+REPLAY_WINDOW = 5.0  # seconds; older messages already fail the timestamp check
+
+# Hash constructors by algorithm name; hashlib's OpenSSL backend picks the
+# fastest implementation for the CPU (e.g. SHA extensions) on its own
+_HASH_CTORS = {
+    'sha256': hashlib.sha256,
+    'md5': hashlib.md5,
+    'sha1': hashlib.sha1,
+    'blake2b': hashlib.blake2b,
+    'sha3_256': hashlib.sha3_256,
+}
+if HAVE_BLAKE3:
+    _HASH_CTORS['blake3'] = blake3.blake3
+
+# Replay detection only needs collision resistance, not a signing hash, so it
+# uses BLAKE3 when the optional package is installed
+_REPLAY_HASH = blake3.blake3 if HAVE_BLAKE3 else hashlib.sha256
+
+# Fixed-width metadata appended to the payload before signing: timestamp, sequence number
+_HEADER = struct.Struct('<dQ')
+
+# Signature parameters are stateless, so one instance of each is shared
+_SHA256 = hashes.SHA256()
+_PSS = padding.PSS(mgf=padding.MGF1(_SHA256), salt_length=padding.PSS.MAX_LENGTH)
+_ECDSA_SHA256 = ec.ECDSA(_SHA256)
+
+def _signature_args(key) -> tuple:
+    """Arguments that follow the data in sign()/verify() for a key's algorithm."""
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return (_PSS, _SHA256)
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        # Ed25519 hashes internally; no separate digest argument
+        return ()
+    return (_ECDSA_SHA256,)
+
 @dataclass
 class Certificate:
     subject: str
@@ -17,6 +68,25 @@ class Certificate:
     valid_from: float
     valid_until: float
 
+@lru_cache(maxsize=1024)
+def _parse_certificate(cert_bytes: bytes) -> Certificate:
+    """Parse a DER or PEM X.509 certificate; repeated sightings of a peer hit the cache."""
+    if cert_bytes.startswith(b'-----BEGIN'):
+        cert = x509.load_pem_x509_certificate(cert_bytes)
+    else:
+        cert = x509.load_der_x509_certificate(cert_bytes)
+    return Certificate(
+        subject=cert.subject.rfc4514_string(),
+        issuer=cert.issuer.rfc4514_string(),
+        public_key=cert.public_key().public_bytes(
+            encoding=Encoding.DER,
+            format=PublicFormat.SubjectPublicKeyInfo
+        ),
+        signature=cert.signature,
+        valid_from=cert.not_valid_before_utc.timestamp(),
+        valid_until=cert.not_valid_after_utc.timestamp()
+    )
+
 @dataclass
 class SecureMessage:
     payload: bytes
@@ -30,12 +100,29 @@ class CryptoModule:
         self.private_key = None
         self.public_key = None
         self.certificate = None
-        self.message_history: Dict[str, List[tuple]] = {}  # (timestamp, sequence_number, hash)
+        self._sign_args: tuple = ()
+        self._pub_der: Optional[bytes] = None  # DER-encoded public key
+        self._pub_fp: Optional[bytes] = None   # SHA-256 fingerprint of the DER key
+        # Key agreement key and symmetric per-peer session keys (peer fingerprint -> key)
+        self._dh_key: Optional[x25519.X25519PrivateKey] = None
+        self.dh_public_bytes: Optional[bytes] = None
+        self._session_keys: Dict[bytes, bytes] = {}
+        # Deserialized peer public keys by their DER/PEM bytes
+        self._peer_keys: Dict[bytes, object] = {}
+        # Per sender: entries in arrival order plus a set of the same entries for
+        # O(1) lookups; entry = (timestamp, sequence_number, hash)
+        self.message_history: Dict[bytes, Tuple[Deque[tuple], Set[tuple]]] = {}
+        self._sequence_number = 0
         
-    def generate_key_pair(self, use_ecdsa: bool = True) -> bool:
-        """Generate a new key pair using either ECDSA or RSA."""
+    def generate_key_pair(self, use_ecdsa: bool = True, curve: str = 'ed25519') -> bool:
+        """Generate a new key pair using either elliptic curves (Ed25519 or ECDSA on secp256k1) or RSA."""
         try:
-            if use_ecdsa:
+            if use_ecdsa and curve == 'ed25519':
+                self.private_key = ed25519.Ed25519PrivateKey.generate()
+                self.public_key = self.private_key.public_key()
+            elif use_ecdsa:
+                if curve != 'secp256k1':
+                    raise ValueError(f"Unsupported curve: {curve}")
                 self.private_key = ec.generate_private_key(ec.SECP256K1())
                 self.public_key = self.private_key.public_key()
             else:
@@ -44,25 +131,38 @@ class CryptoModule:
                     key_size=2048
                 )
                 self.public_key = self.private_key.public_key()
+            
+            self._sign_args = _signature_args(self.private_key)
+            
+            # Serialize the public key once; messages reuse the bytes and fingerprint
+            self._pub_der = self.public_key.public_bytes(
+                encoding=Encoding.DER,
+                format=PublicFormat.SubjectPublicKeyInfo
+            )
+            self._pub_fp = hashlib.sha256(self._pub_der).digest()
+            
+            # Separate X25519 key for deriving session keys with peers
+            self._dh_key = x25519.X25519PrivateKey.generate()
+            self.dh_public_bytes = self._dh_key.public_key().public_bytes(
+                encoding=Encoding.Raw,
+                format=PublicFormat.Raw
+            )
             return True
         except Exception as e:
-            print(f"Key generation failed: {e}")
+            logger.debug("Key generation failed: %s", e)
             return False
 
     def hash_message(self, message: bytes, algorithm: str = 'sha256') -> bytes:
         """Hash a message using the specified algorithm."""
-        if algorithm == 'sha256':
-            return hashlib.sha256(message).digest()
-        elif algorithm == 'md5':
-            return hashlib.md5(message).digest()
-        elif algorithm == 'sha1':
-            return hashlib.sha1(message).digest()
-        elif algorithm == 'blake2b':
-            return hashlib.blake2b(message).digest()
-        elif algorithm == 'sha3_256':
-            return hashlib.sha3_256(message).digest()
-        else:
-            raise ValueError(f"Unsupported hash algorithm: {algorithm}")
+        try:
+            hash_ctor = _HASH_CTORS[algorithm]
+        except KeyError:
+            raise ValueError(f"Unsupported hash algorithm: {algorithm}") from None
+        return hash_ctor(message).digest()
+
+    def hash_sha256(self, message: bytes) -> bytes:
+        """SHA-256 digest of a message; the common case of hash_message without the lookup."""
+        return hashlib.sha256(message).digest()
 
     def sign_message(self, message: bytes) -> bytes:
         """Sign a message using the private key."""
@@ -70,73 +170,76 @@ class CryptoModule:
             raise ValueError("Private key not available")
 
         try:
-            if isinstance(self.private_key, rsa.RSAPrivateKey):
-                signature = self.private_key.sign(
-                    message,
-                    padding.PSS(
-                        mgf=padding.MGF1(hashes.SHA256()),
-                        salt_length=padding.PSS.MAX_LENGTH
-                    ),
-                    hashes.SHA256()
-                )
-            else:  # ECDSA
-                signature = self.private_key.sign(
-                    message,
-                    ec.ECDSA(hashes.SHA256())
-                )
-            return signature
+            return self.private_key.sign(message, *self._sign_args)
         except Exception as e:
-            print(f"Message signing failed: {e}")
+            logger.debug("Message signing failed: %s", e)
             return b""
 
     def verify_signature(self, message: bytes, signature: bytes, public_key_bytes: bytes) -> bool:
         """Verify a message signature using a public key."""
+        return self._verify_with_key(self._load_public_key(public_key_bytes), message, signature)
+
+    def _load_public_key(self, public_key_bytes: bytes):
+        """Deserialize a PEM or DER public key."""
+        try:
+            if b'BEGIN PUBLIC KEY' in public_key_bytes:
+                return serialization.load_pem_public_key(public_key_bytes)
+            return serialization.load_der_public_key(public_key_bytes)
+        except Exception:
+            # If deserialization fails, try using our own public key
+            return self.public_key
+
+    def _peer_key(self, public_key_bytes: bytes):
+        """Deserialized public key for the given bytes, parsed on first sight only."""
+        public_key = self._peer_keys.get(public_key_bytes)
+        if public_key is None:
+            public_key = self._peer_keys[public_key_bytes] = self._load_public_key(public_key_bytes)
+        return public_key
+
+    def _verify_with_key(self, public_key, message: bytes, signature: bytes) -> bool:
+        """Verify a message signature with an already deserialized public key."""
         if not signature or not message:
             return False
             
         try:
-            # Deserialize public key
-            try:
-                if b'BEGIN PUBLIC KEY' in public_key_bytes:
-                    public_key = serialization.load_pem_public_key(public_key_bytes)
-                else:
-                    public_key = serialization.load_der_public_key(public_key_bytes)
-            except Exception:
-                # If deserialization fails, try using our own public key
-                public_key = self.public_key
-
-            if isinstance(public_key, rsa.RSAPublicKey):
-                public_key.verify(
-                    signature,
-                    message,
-                    padding.PSS(
-                        mgf=padding.MGF1(hashes.SHA256()),
-                        salt_length=padding.PSS.MAX_LENGTH
-                    ),
-                    hashes.SHA256()
-                )
-            else:  # ECDSA
-                public_key.verify(
-                    signature,
-                    message,
-                    ec.ECDSA(hashes.SHA256())
-                )
+            public_key.verify(signature, message, *_signature_args(public_key))
             return True
         except (InvalidSignature, Exception) as e:
-            print(f"Signature verification failed: {e}")
+            logger.debug("Signature verification failed: %s", e)
             return False
 
-    def create_secure_message(self, payload: bytes) -> SecureMessage:
-        """Create a secure message with signature and metadata."""
+    def establish_session(self, peer_fp: bytes, peer_dh_public: bytes) -> bytes:
+        """Derive (X25519 + HKDF) and store the symmetric session key shared with a peer."""
+        shared_secret = self._dh_key.exchange(x25519.X25519PublicKey.from_public_bytes(peer_dh_public))
+        session_key = HKDF(
+            algorithm=_SHA256,
+            length=32,
+            salt=None,
+            info=b'vanet-session'
+        ).derive(shared_secret)
+        self._session_keys[peer_fp] = session_key
+        return session_key
+
+    def create_secure_message(self, payload: bytes, peer: Optional[bytes] = None) -> SecureMessage:
+        """Create a secure message with signature and metadata.
+        
+        If a session with the peer (fingerprint) has been established the message
+        is authenticated with HMAC-SHA256 instead of an asymmetric signature.
+        """
         if not payload:
             raise ValueError("Empty payload")
             
         timestamp = time.time()
-        sequence_number = len(self.message_history.get(str(self.public_key), [])) + 1
+        self._sequence_number += 1
+        sequence_number = self._sequence_number
         
         # Combine payload with metadata for signing
-        message_data = payload + str(timestamp).encode() + str(sequence_number).encode()
-        signature = self.sign_message(message_data)
+        message_data = payload + _HEADER.pack(timestamp, sequence_number)
+        session_key = self._session_keys.get(peer) if peer else None
+        if session_key:
+            signature = hmac.digest(session_key, message_data, 'sha256')
+        else:
+            signature = self.sign_message(message_data)
         
         if not signature:
             raise ValueError("Failed to sign message")
@@ -154,73 +257,93 @@ class CryptoModule:
             secure_msg.sender_cert = self.certificate
             
         # Update message history
-        if str(self.public_key) not in self.message_history:
-            self.message_history[str(self.public_key)] = []
-        self.message_history[str(self.public_key)].append(
-            (timestamp, sequence_number, self.hash_message(payload))
-        )
+        self._record_message(self._pub_fp, (timestamp, sequence_number, _REPLAY_HASH(payload).digest()))
         
         return secure_msg
 
-    def verify_secure_message(self, message: SecureMessage) -> bool:
-        """Verify a secure message's integrity and authenticity."""
+    def _record_message(self, sender: bytes, entry: tuple):
+        """Add a message to the sender's history, evicting old or excess entries."""
+        history, seen = self.message_history.setdefault(sender, (deque(), set()))
+        history.append(entry)
+        seen.add(entry)
+        
+        oldest_allowed = entry[0] - REPLAY_WINDOW
+        while len(history) > MAX_MESSAGE_HISTORY or history[0][0] < oldest_allowed:
+            seen.discard(history.popleft())
+
+    def verify_secure_message(self, message: SecureMessage, peer: Optional[bytes] = None) -> bool:
+        """Verify a secure message's integrity and authenticity.
+        
+        Messages from a peer (fingerprint) with an established session are checked
+        against their HMAC; all others against the asymmetric signature.
+        """
         try:
+            # Cheapest checks first so stale or replayed traffic never reaches crypto
+            current_time = time.time()
+            
             # Check timestamp (5 second tolerance)
-            if abs(time.time() - message.timestamp) > 5:
+            if abs(current_time - message.timestamp) > 5:
                 return False
                 
             # Check for replay
             if self.is_replay_message(message):
                 return False
+            
+            # Combine message data for verification
+            message_data = message.payload + _HEADER.pack(message.timestamp, message.sequence_number)
+            
+            # A session key authenticates the peer already; no certificate needed
+            session_key = self._session_keys.get(peer) if peer else None
+            if session_key:
+                expected = hmac.digest(session_key, message_data, 'sha256')
+                return hmac.compare_digest(expected, message.signature)
                 
             # Verify certificate if present
+            cert = None
             if message.sender_cert:
                 cert = self._deserialize_certificate(message.sender_cert)
-                if not self._verify_certificate(cert):
+                if not self._verify_certificate(cert, current_time):
                     return False
             
-            # Combine message data for verification
-            message_data = message.payload + str(message.timestamp).encode() + str(message.sequence_number).encode()
-            
             # Get public key for verification
-            public_key_bytes = message.sender_cert if message.sender_cert else (
-                self.public_key.public_bytes(
-                    encoding=Encoding.DER,
-                    format=PublicFormat.SubjectPublicKeyInfo
-                ) if self.public_key else None
-            )
+            public_key_bytes = cert.public_key if cert else self._pub_der
             
             if not public_key_bytes:
                 return False
                 
-            return self.verify_signature(message_data, message.signature, public_key_bytes)
+            return self._verify_with_key(self._peer_key(public_key_bytes), message_data, message.signature)
         except Exception as e:
-            print(f"Message verification failed: {e}")
+            logger.debug("Message verification failed: %s", e)
             return False
 
+    def batch_verify(self, messages: List[SecureMessage], pubkeys: List[bytes]) -> List[bool]:
+        """Verify several secure messages against their senders' public keys."""
+        current_time = time.time()
+        results = []
+        for message, public_key_bytes in zip(messages, pubkeys):
+            # Same timestamp and replay checks as verify_secure_message
+            if abs(current_time - message.timestamp) > 5 or self.is_replay_message(message):
+                results.append(False)
+                continue
+            
+            message_data = message.payload + _HEADER.pack(message.timestamp, message.sequence_number)
+            results.append(self._verify_with_key(self._peer_key(public_key_bytes), message_data, message.signature))
+        return results
+
     def is_replay_message(self, message: SecureMessage) -> bool:
         """Check if a message is a replay attack."""
-        for timestamp, seq, msg_hash in self.message_history.get(str(self.public_key), []):
-            if (message.timestamp == timestamp and 
-                message.sequence_number == seq and 
-                self.hash_message(message.payload) == msg_hash):
-                return True
-        return False
+        history = self.message_history.get(self._pub_fp)
+        if history is None:
+            return False
+        entry = (message.timestamp, message.sequence_number, _REPLAY_HASH(message.payload).digest())
+        return entry in history[1]
 
     def _deserialize_certificate(self, cert_bytes: bytes) -> Certificate:
         """Deserialize a certificate from bytes."""
-        # Implementation depends on your certificate format
-        # This is a simplified example
-        return Certificate(
-            subject="test",
-            issuer="test",
-            public_key=cert_bytes,
-            signature=b"",
-            valid_from=time.time(),
-            valid_until=time.time() + 3600
-        )
+        return _parse_certificate(cert_bytes)
 
-    def _verify_certificate(self, cert: Certificate) -> bool:
+    def _verify_certificate(self, cert: Certificate, current_time: Optional[float] = None) -> bool:
         """Verify a certificate's validity."""
-        current_time = time.time()
+        if current_time is None:
+            current_time = time.time()
         return cert.valid_from <= current_time <= cert.valid_until 
\ No newline at end of file
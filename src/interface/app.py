@@ -1,5 +1,5 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import time
@@ -14,7 +14,8 @@ project_root = str(Path(__file__).parent.parent.parent)
 if project_root not in sys.path:
     sys.path.append(project_root)
 
-from src.simulation.vanet_sim import VANETSimulation, SimulationConfig
+from src.simulation.vanet_sim import VANETSimulation, SimulationConfig, SimStats
+from src.simulation._kernels import warm_up as warm_up_kernels
 
 # Custom styling
 st.set_page_config(
@@ -74,7 +75,61 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def create_plotly_figure(simulation):
+@st.cache_resource(show_spinner=False)
+def _warm_up_kernels():
+    """Compile the simulation kernels once per process, before the first Start click."""
+    warm_up_kernels()
+
+_warm_up_kernels()
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def run_simulation(config: SimulationConfig) -> VANETSimulation:
+    """Run a simulation once per distinct configuration.
+    
+    Cached as a resource: the simulation holds per-vehicle key material that
+    can't be pickled, and it isn't modified after run().
+    """
+    simulation = VANETSimulation(config)
+    simulation.run()
+    return simulation
+
+# Points kept per trace; longer series are downsampled with LTTB before plotting
+MAX_PLOT_POINTS = 2000
+
+def lttb_downsample(x: np.ndarray, y: np.ndarray, n_out: int = MAX_PLOT_POINTS):
+    """Largest-Triangle-Three-Buckets downsampling of a time series.
+    
+    Keeps the first and last points and, for every bucket in between, the point
+    forming the largest triangle with the previously kept point and the mean of
+    the next bucket, which preserves peaks and the overall shape of the curve.
+    """
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return x, y
+    
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the following bucket (or the last point for the final bucket)
+        nxt_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:nxt_end].mean()
+        avg_y = y[end:nxt_end].mean()
+        
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    
+    return x[keep], y[keep]
+
+@st.cache_data(show_spinner=False)
+def create_plotly_figure(stats: SimStats, sim_time: float) -> go.Figure:
     """Create interactive plotly figures from simulation results."""
     fig = make_subplots(
         rows=2, cols=2,
@@ -86,44 +141,44 @@ def create_plotly_figure(simulation):
         )
     )
     
-    time_range = pd.Series(range(len(simulation.stats['packet_delivery_ratio']))) * (
-        simulation.config.sim_time / len(simulation.stats['packet_delivery_ratio']))
+    # Hand plotly contiguous float32 arrays rather than Python lists
+    series = {key: values.astype(np.float32) for key, values in stats.as_dict().items()}
+    n = len(series['packet_delivery_ratio'])
+    time_range = np.arange(n, dtype=np.float32) * (sim_time / n)
+    
+    def trace(key, name, color):
+        x, y = lttb_downsample(time_range, series[key])
+        return go.Scattergl(x=x, y=y, name=name, line=dict(color=color))
     
     # Plot 1: Packet Delivery Ratio
     fig.add_trace(
-        go.Scatter(x=time_range, y=simulation.stats['packet_delivery_ratio'],
-                  name='PDR', line=dict(color='#2e4057')),
+        trace('packet_delivery_ratio', 'PDR', '#2e4057'),
         row=1, col=1
     )
     
     # Plot 2: Messages
     fig.add_trace(
-        go.Scatter(x=time_range, y=simulation.stats['messages_sent'],
-                  name='Messages Sent', line=dict(color='#2e4057')),
+        trace('messages_sent', 'Messages Sent', '#2e4057'),
         row=1, col=2
     )
     fig.add_trace(
-        go.Scatter(x=time_range, y=simulation.stats['messages_received'],
-                  name='Messages Received', line=dict(color='#48a9a6')),
+        trace('messages_received', 'Messages Received', '#48a9a6'),
         row=1, col=2
     )
     
     # Plot 3: Attacks
     fig.add_trace(
-        go.Scatter(x=time_range, y=simulation.stats['attacks_attempted'],
-                  name='Attacks Attempted', line=dict(color='#e63946')),
+        trace('attacks_attempted', 'Attacks Attempted', '#e63946'),
         row=2, col=1
     )
     fig.add_trace(
-        go.Scatter(x=time_range, y=simulation.stats['attacks_detected'],
-                  name='Attacks Detected', line=dict(color='#2a9d8f')),
+        trace('attacks_detected', 'Attacks Detected', '#2a9d8f'),
         row=2, col=1
     )
     
     # Plot 4: Trust Scores
     fig.add_trace(
-        go.Scatter(x=time_range, y=simulation.stats['trust_scores'],
-                  name='Trust Score', line=dict(color='#2e4057')),
+        trace('trust_scores', 'Trust Score', '#2e4057'),
         row=2, col=2
     )
     
@@ -140,27 +195,100 @@ def create_plotly_figure(simulation):
     
     return fig
 
-def generate_report(simulation):
+_REPORT_TEMPLATE = """VANET Secure Routing Simulation Report
+=====================================
+
+Simulation Configuration:
+- Number of Vehicles: {num_vehicles}
+- Number of Malicious Nodes: {num_malicious}
+- Simulation Time: {sim_time} seconds
+- Area Size: {area_size}x{area_size} meters
+- Speed Range: {min_speed}-{max_speed} km/h
+
+Performance Metrics:
+- Final Packet Delivery Ratio: {packet_delivery_ratio:.2%}
+- Total Messages Sent: {messages_sent}
+- Total Messages Received: {messages_received}
+- Attacks Attempted: {attacks_attempted}
+- Attacks Detected: {attacks_detected}
+- Final Average Trust Score: {trust_scores:.2f}"""
+
+@st.cache_data(show_spinner=False)
+def generate_report(config: SimulationConfig, stats: SimStats) -> str:
     """Generate a report string from simulation results."""
-    report = []
-    report.append("VANET Secure Routing Simulation Report")
-    report.append("=====================================")
-    report.append(f"\nSimulation Configuration:")
-    report.append(f"- Number of Vehicles: {simulation.config.num_vehicles}")
-    report.append(f"- Number of Malicious Nodes: {simulation.config.num_malicious}")
-    report.append(f"- Simulation Time: {simulation.config.sim_time} seconds")
-    report.append(f"- Area Size: {simulation.config.area_size}x{simulation.config.area_size} meters")
-    report.append(f"- Speed Range: {simulation.config.min_speed}-{simulation.config.max_speed} km/h")
+    final_stats = {name: series[-1] for name, series in stats.as_dict().items()}
+    return _REPORT_TEMPLATE.format_map({**vars(config), **final_stats})
+
+@st.fragment
+def render_results(sim: VANETSimulation):
+    """Render the results of a finished simulation.
+    
+    Runs as a fragment, so clicking the buttons in here reruns only this
+    function instead of the whole script.
+    """
+    # Display metrics, one markdown element per card
+    col1, col2, col3, col4 = st.columns(4)
+    detection_rate = sim.stats.attacks_detected[-1]/max(1, sim.stats.attacks_attempted[-1])
+    cards = [
+        (col1, f'{sim.stats.packet_delivery_ratio[-1]:.2%}', 'Packet Delivery Ratio'),
+        (col2, f'{sim.stats.messages_received[-1]}', 'Messages Received'),
+        (col3, f'{detection_rate:.2%}', 'Attack Detection Rate'),
+        (col4, f'{sim.stats.trust_scores[-1]:.2f}', 'Average Trust Score'),
+    ]
+    for col, value, label in cards:
+        col.markdown(
+            f'<div class="metric-card"><div class="metric-value">{value}</div>'
+            f'<div class="metric-label">{label}</div></div>',
+            unsafe_allow_html=True
+        )
     
-    report.append("\nPerformance Metrics:")
-    report.append(f"- Final Packet Delivery Ratio: {simulation.stats['packet_delivery_ratio'][-1]:.2%}")
-    report.append(f"- Total Messages Sent: {simulation.stats['messages_sent'][-1]}")
-    report.append(f"- Total Messages Received: {simulation.stats['messages_received'][-1]}")
-    report.append(f"- Attacks Attempted: {simulation.stats['attacks_attempted'][-1]}")
-    report.append(f"- Attacks Detected: {simulation.stats['attacks_detected'][-1]}")
-    report.append(f"- Final Average Trust Score: {simulation.stats['trust_scores'][-1]:.2f}")
+    # Display interactive plots
+    st.plotly_chart(create_plotly_figure(sim.stats, sim.config.sim_time), use_container_width=True)
     
-    return "\n".join(report)
+    # Comparison against the baseline systems
+    with st.expander("Comparative Analysis"):
+        st.plotly_chart(sim.comparison_figure(), use_container_width=True)
+    
+    # Generate report text
+    report_text = generate_report(sim.config, sim.stats)
+    
+    # Display report in expandable section
+    with st.expander("View Detailed Report"):
+        st.text(report_text)
+    
+    # Save Results button
+    if st.button("Save Results"):
+        # Create results directory
+        Path("results").mkdir(exist_ok=True)
+        
+        # Save report
+        with open("results/simulation_report.txt", "w") as f:
+            f.write(report_text)
+        
+        # Render plots in memory for the download button
+        plot_png = sim.plot_results_to_buffer().getvalue()
+        
+        # Create download buttons
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                label="Download Report",
+                data=report_text,
+                file_name="simulation_report.txt",
+                mime="text/plain"
+            )
+        with col2:
+            st.download_button(
+                label="Download Plots",
+                data=plot_png,
+                file_name="simulation_results.png",
+                mime="image/png"
+            )
+    
+    # Reset button
+    if st.button("Run New Simulation"):
+        st.session_state.simulation_complete = False
+        st.rerun()
 
 def main():
     st.title("🚗 VANET Secure Routing Simulator")
@@ -175,9 +303,6 @@ def main():
     min_speed = st.sidebar.slider("Minimum Speed (km/h)", 0, 50, 20)
     max_speed = st.sidebar.slider("Maximum Speed (km/h)", min_speed, 100, 50)
     
-    # Create columns for the metrics
-    col1, col2, col3, col4 = st.columns(4)
-    
     # Initialize session state
     if 'simulation_running' not in st.session_state:
         st.session_state.simulation_running = False
@@ -200,11 +325,9 @@ def main():
                 max_speed=max_speed
             )
             
-            st.session_state.simulation = VANETSimulation(config)
-            
             # Run simulation
             with st.spinner("Running simulation..."):
-                st.session_state.simulation.run()
+                st.session_state.simulation = run_simulation(config)
                 
             st.session_state.simulation_running = False
             st.session_state.simulation_complete = True
@@ -212,78 +335,7 @@ def main():
     
     # Display results if simulation is complete
     if st.session_state.simulation_complete:
-        sim = st.session_state.simulation
-        
-        # Display metrics
-        with col1:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.markdown(f'<div class="metric-value">{sim.stats["packet_delivery_ratio"][-1]:.2%}</div>', unsafe_allow_html=True)
-            st.markdown('<div class="metric-label">Packet Delivery Ratio</div>', unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
-            
-        with col2:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.markdown(f'<div class="metric-value">{sim.stats["messages_received"][-1]}</div>', unsafe_allow_html=True)
-            st.markdown('<div class="metric-label">Messages Received</div>', unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
-            
-        with col3:
-            detection_rate = sim.stats["attacks_detected"][-1]/max(1, sim.stats["attacks_attempted"][-1])
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.markdown(f'<div class="metric-value">{detection_rate:.2%}</div>', unsafe_allow_html=True)
-            st.markdown('<div class="metric-label">Attack Detection Rate</div>', unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
-            
-        with col4:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.markdown(f'<div class="metric-value">{sim.stats["trust_scores"][-1]:.2f}</div>', unsafe_allow_html=True)
-            st.markdown('<div class="metric-label">Average Trust Score</div>', unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Display interactive plots
-        st.plotly_chart(create_plotly_figure(sim), use_container_width=True)
-        
-        # Generate report text
-        report_text = generate_report(sim)
-        
-        # Display report in expandable section
-        with st.expander("View Detailed Report"):
-            st.text(report_text)
-        
-        # Save Results button
-        if st.button("Save Results"):
-            # Create results directory
-            Path("results").mkdir(exist_ok=True)
-            
-            # Save report
-            with open("results/simulation_report.txt", "w") as f:
-                f.write(report_text)
-            
-            # Save plots
-            sim.plot_results()
-            
-            # Create download buttons
-            col1, col2 = st.columns(2)
-            with col1:
-                st.download_button(
-                    label="Download Report",
-                    data=report_text,
-                    file_name="simulation_report.txt",
-                    mime="text/plain"
-                )
-            with col2:
-                with open("results/simulation_results.png", "rb") as f:
-                    st.download_button(
-                        label="Download Plots",
-                        data=f.read(),
-                        file_name="simulation_results.png",
-                        mime="image/png"
-                    )
-        
-        # Reset button
-        if st.button("Run New Simulation"):
-            st.session_state.simulation_complete = False
-            st.rerun()
+        render_results(st.session_state.simulation)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
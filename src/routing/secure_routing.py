@@ -2,16 +2,52 @@ from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
 import time
 import math
+import struct
+import heapq
+import numpy as np
 from ..crypto.crypto_module import CryptoModule, SecureMessage
 
-@dataclass
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+def _distance(x1: float, y1: float, z1: float, x2: float, y2: float, z2: float) -> float:
+    return math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2 + (z1 - z2) ** 2)
+
+def _valid_movement(ox: float, oy: float, oz: float, ot: float,
+                    nx: float, ny: float, nz: float, nt: float,
+                    max_speed: float, max_acceleration: float) -> bool:
+    time_elapsed = nt - ot
+    if time_elapsed <= 0:
+        return False
+    
+    # Speed in km/h
+    speed = _distance(ox, oy, oz, nx, ny, nz) / time_elapsed * 3.6
+    if speed > max_speed:
+        return False
+    
+    return speed / time_elapsed <= max_acceleration
+
+# Routing message layout: type, sender id length, destination length, then the
+# sender id, destination, timestamp (fixed 8-byte double) and payload
+_ROUTING_HEADER = struct.Struct('<BHH')
+_TIMESTAMP = struct.Struct('<d')
+
+# Numba is optional; without it the same scalar functions run as plain Python
+if HAVE_NUMBA:
+    _distance = njit(cache=True, fastmath=True)(_distance)
+    _valid_movement = njit(cache=True)(_valid_movement)
+
+@dataclass(slots=True)
 class Position:
     x: float
     y: float
     z: float
     timestamp: float
 
-@dataclass
+@dataclass(slots=True)
 class VehicleInfo:
     id: str
     position: Position
@@ -20,7 +56,7 @@ class VehicleInfo:
     trust_score: float
     certificate: Optional[bytes] = None
 
-@dataclass
+@dataclass(slots=True)
 class RouteEntry:
     next_hop: str
     hop_count: int
@@ -43,6 +79,13 @@ class SecureRoutingProtocol:
         self.neighbor_table: Dict[str, VehicleInfo] = {}
         self.trust_scores: Dict[str, float] = {}
         self.message_tracking: Dict[str, Tuple[int, float]] = {}  # (last_sequence, last_update)
+        # Neighbor ids and their (x, y, z) positions as an (N, 3) array, rebuilt
+        # lazily after the neighbor table changes
+        self._neighbor_ids: Dict[str, int] = {}
+        self._neighbor_pos: Optional[np.ndarray] = None
+        # Min-heaps of (expiry_time, key); entries refreshed since are skipped on pop
+        self._route_expiry: List[Tuple[float, str]] = []
+        self._neighbor_expiry: List[Tuple[float, str]] = []
         
         # Constants
         self.MAX_TRUST_SCORE = 1.0
@@ -53,9 +96,16 @@ class SecureRoutingProtocol:
         self.ROUTE_TIMEOUT = 60  # seconds
         self.NEIGHBOR_TIMEOUT = 10  # seconds
         self.MAX_HOP_COUNT = 10
+        self.SYBIL_RADIUS = 1.0  # meters
+        self.SYBIL_MAX_COLOCATED = 2  # other identities allowed within SYBIL_RADIUS
         
         # Initialize cryptographic keys
         self.crypto_module.generate_key_pair()
+        
+        # HELLO beacons differ only in their timestamp, so the serialized beacon is
+        # built once and each copy only gets its timestamp patched in
+        self._beacon_template = bytearray(self._create_routing_message(MessageType.HELLO, ""))
+        self._beacon_ts_offset = len(self._beacon_template) - _TIMESTAMP.size
 
     def initialize_vehicle(self, info: VehicleInfo) -> bool:
         """Initialize the vehicle with its information."""
@@ -74,7 +124,7 @@ class SecureRoutingProtocol:
             return False
             
         self.local_info.position = new_pos
-        self._prune_expired_entries()
+        self._prune_expired_entries(new_pos.timestamp)
         return True
 
     def send_data(self, destination: str, data: bytes) -> bool:
@@ -125,6 +175,11 @@ class SecureRoutingProtocol:
             print(f"Error processing message: {e}")
             return False
 
+    def receive_batch(self, messages: List[bytes]) -> int:
+        """Process several received messages in order; returns how many were accepted."""
+        receive = self.receive_message
+        return sum(receive(message) for message in messages)
+
     def find_route(self, destination: str) -> bool:
         """Initiate route discovery to destination."""
         message = self._create_routing_message(MessageType.ROUTE_REQUEST, destination)
@@ -139,10 +194,11 @@ class SecureRoutingProtocol:
         if entry.hop_count >= self.MAX_HOP_COUNT:
             return False
             
-        if time.time() - entry.timestamp > self.ROUTE_TIMEOUT:
+        if self._now() - entry.timestamp > self.ROUTE_TIMEOUT:
             return False
             
         self.routing_table[destination] = entry
+        heapq.heappush(self._route_expiry, (entry.timestamp + self.ROUTE_TIMEOUT, destination))
         return True
 
     def calculate_trust(self, vehicle_id: str) -> float:
@@ -163,6 +219,16 @@ class SecureRoutingProtocol:
                 
         return max(min(score, self.MAX_TRUST_SCORE), self.MIN_TRUST_SCORE)
 
+    def get_trust_array(self, vehicle_ids: List[str]) -> np.ndarray:
+        """calculate_trust for each of the given vehicles, as a float64 array."""
+        # Vehicles never heard from score MIN_TRUST_SCORE; skip the per-id calls
+        if not self.trust_scores:
+            return np.full(len(vehicle_ids), self.MIN_TRUST_SCORE)
+        return np.fromiter(
+            (self.calculate_trust(vid) for vid in vehicle_ids),
+            dtype=np.float64, count=len(vehicle_ids)
+        )
+
     def update_trust_score(self, vehicle_id: str, score: float):
         """Update trust score using exponential moving average."""
         current_score = self.trust_scores.get(vehicle_id, self.MAX_TRUST_SCORE)
@@ -173,13 +239,20 @@ class SecureRoutingProtocol:
         """Check if a vehicle's trust score is above threshold."""
         return self.calculate_trust(vehicle_id) >= self.TRUST_THRESHOLD
 
-    def send_beacon(self):
-        """Send periodic beacon message."""
-        message = self._create_routing_message(MessageType.HELLO, "")
-        secure_message = self.crypto_module.create_secure_message(message)
+    def send_beacon(self, peer: Optional[bytes] = None) -> SecureMessage:
+        """Send periodic beacon message.
+        
+        Returns the beacon as built by CryptoModule.create_secure_message: tagged with
+        HMAC-SHA256 under the session key if one is established with peer (a key
+        fingerprint), otherwise signed. Receivers check it with verify_secure_message.
+        """
+        message = self._beacon_template[:]
+        _TIMESTAMP.pack_into(message, self._beacon_ts_offset, time.time())
+        secure_message = self.crypto_module.create_secure_message(bytes(message), peer)
         
         # In a real implementation, this would broadcast the beacon
-        # For simulation, we'll just pass
+        # For simulation, we just hand it back
+        return secure_message
 
     def process_beacon(self, beacon: bytes) -> bool:
         """Process received beacon message."""
@@ -189,6 +262,9 @@ class SecureRoutingProtocol:
                 return False
                 
             self.neighbor_table[info.id] = info
+            self._neighbor_pos = None
+            heapq.heappush(self._neighbor_expiry,
+                           (info.position.timestamp + self.NEIGHBOR_TIMEOUT, info.id))
             self.update_trust_score(info.id, 1.0)
             return True
         except Exception:
@@ -202,9 +278,26 @@ class SecureRoutingProtocol:
 
     def detect_sybil(self, suspect_id: str) -> bool:
         """Detect Sybil attack behavior."""
-        # Implementation would check for multiple identities
-        # from similar positions
-        return False
+        # Multiple identities reporting (almost) the same position
+        if suspect_id not in self.neighbor_table:
+            return False
+        
+        positions = self._neighbor_positions()
+        row = positions[self._neighbor_ids[suspect_id]]
+        distances = np.linalg.norm(positions - row, axis=1)
+        colocated = np.count_nonzero(distances < self.SYBIL_RADIUS) - 1  # minus the suspect
+        return bool(colocated > self.SYBIL_MAX_COLOCATED)
+    
+    def _neighbor_positions(self) -> np.ndarray:
+        """Positions of all neighbors as an (N, 3) array, rows indexed by _neighbor_ids."""
+        if self._neighbor_pos is None:
+            self._neighbor_ids = {vid: i for i, vid in enumerate(self.neighbor_table)}
+            self._neighbor_pos = np.array(
+                [(info.position.x, info.position.y, info.position.z)
+                 for info in self.neighbor_table.values()],
+                dtype=np.float32
+            ).reshape(-1, 3)
+        return self._neighbor_pos
 
     def detect_position_falsification(self, vehicle_id: str, reported_pos: Position) -> bool:
         """Detect position falsification attack."""
@@ -218,24 +311,30 @@ class SecureRoutingProtocol:
 
     def _create_routing_message(self, msg_type: int, destination: str, data: bytes = b"") -> bytes:
         """Create a routing message."""
-        message = bytearray([msg_type])
-        message.extend(self.vehicle_id.encode())
-        message.append(0)  # null terminator
-        message.extend(destination.encode())
-        message.append(0)  # null terminator
-        message.extend(str(time.time()).encode())
-        if data:
-            message.extend(data)
-        return bytes(message)
+        sender = self.vehicle_id.encode()
+        dest = destination.encode()
+        return b"".join((
+            _ROUTING_HEADER.pack(msg_type, len(sender), len(dest)),
+            sender,
+            dest,
+            _TIMESTAMP.pack(time.time()),
+            data
+        ))
 
     def _deserialize_message(self, message: bytes) -> SecureMessage:
         """Deserialize a received message."""
-        # Implementation depends on your message format
-        # This is a simplified example
+        # Take the timestamp from the routing header when the message carries one
+        timestamp = time.time()
+        if len(message) >= _ROUTING_HEADER.size:
+            _, sender_len, dest_len = _ROUTING_HEADER.unpack_from(message)
+            offset = _ROUTING_HEADER.size + sender_len + dest_len
+            if offset + _TIMESTAMP.size <= len(message):
+                timestamp, = _TIMESTAMP.unpack_from(message, offset)
+        
         return SecureMessage(
             payload=message,
             signature=b"",
-            timestamp=time.time(),
+            timestamp=timestamp,
             sequence_number=0
         )
 
@@ -249,49 +348,38 @@ class SecureRoutingProtocol:
         """Check if movement between positions is physically possible."""
         if not old_pos or not new_pos:
             return True
-            
-        time_elapsed = new_pos.timestamp - old_pos.timestamp
-        if time_elapsed <= 0:
-            return False
-            
-        distance = self._calculate_distance(old_pos, new_pos)
-        speed = distance / time_elapsed
-        
-        # Convert speed to km/h
-        speed = speed * 3.6
         
-        # Check if speed is within reasonable limits
-        if speed > self.MAX_SPEED:
-            return False
-            
-        # Check acceleration
-        acceleration = speed / time_elapsed
-        return acceleration <= self.MAX_ACCELERATION
+        return bool(_valid_movement(
+            old_pos.x, old_pos.y, old_pos.z, old_pos.timestamp,
+            new_pos.x, new_pos.y, new_pos.z, new_pos.timestamp,
+            self.MAX_SPEED, self.MAX_ACCELERATION
+        ))
 
     def _calculate_distance(self, pos1: Position, pos2: Position) -> float:
         """Calculate Euclidean distance between two positions."""
-        return math.sqrt(
-            (pos1.x - pos2.x) ** 2 +
-            (pos1.y - pos2.y) ** 2 +
-            (pos1.z - pos2.z) ** 2
-        )
+        return _distance(pos1.x, pos1.y, pos1.z, pos2.x, pos2.y, pos2.z)
 
-    def _prune_expired_entries(self):
-        """Remove expired entries from routing and neighbor tables."""
-        current_time = time.time()
-        
+    def _now(self) -> float:
+        """Current time on the clock positions are stamped with (the simulation's, when simulated)."""
+        if self.local_info:
+            return self.local_info.position.timestamp
+        return time.time()
+
+    def _prune_expired_entries(self, current_time: float):
+        """Remove routing and neighbor entries that expired by current_time."""
         # Prune routing table
-        expired_routes = [
-            dest for dest, entry in self.routing_table.items()
-            if current_time - entry.timestamp > self.ROUTE_TIMEOUT
-        ]
-        for dest in expired_routes:
-            del self.routing_table[dest]
+        routes = self._route_expiry
+        while routes and routes[0][0] < current_time:
+            _, dest = heapq.heappop(routes)
+            entry = self.routing_table.get(dest)
+            if entry and current_time - entry.timestamp > self.ROUTE_TIMEOUT:
+                del self.routing_table[dest]
             
         # Prune neighbor table
-        expired_neighbors = [
-            vid for vid, info in self.neighbor_table.items()
-            if current_time - info.position.timestamp > self.NEIGHBOR_TIMEOUT
-        ]
-        for vid in expired_neighbors:
-            del self.neighbor_table[vid] 
\ No newline at end of file
+        neighbors = self._neighbor_expiry
+        while neighbors and neighbors[0][0] < current_time:
+            _, vid = heapq.heappop(neighbors)
+            info = self.neighbor_table.get(vid)
+            if info and current_time - info.position.timestamp > self.NEIGHBOR_TIMEOUT:
+                del self.neighbor_table[vid]
+                self._neighbor_pos = None 
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+Compiled per-tick kernels for the vehicle simulation.
+
+Numba is an optional dependency; when it is not installed HAVE_NUMBA is
+False and VehicleKinematics keeps using its NumPy path.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+if HAVE_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def tick(x, y, vx, vy, speed, direction, turn_draws, new_directions, turn_probability,
+             dt, area_size, radius, pairs_i, pairs_j):
+        """Move every vehicle by dt, then write the in-range (i, j) pairs.
+
+        Positions, velocities and headings are updated in place; cos/sin are
+        only evaluated for vehicles that change direction. Pairs are written to
+        pairs_i/pairs_j (room for n * (n - 1) entries), each (i, j) with i < j
+        followed by (j, i), and their count is returned.
+        """
+        n = x.size
+        for i in range(n):
+            # A step moves far less than area_size, so wrap without a float modulo
+            xi = x[i] + vx[i] * dt
+            if xi >= area_size:
+                xi -= area_size
+            elif xi < 0.0:
+                xi += area_size
+            x[i] = xi
+            yi = y[i] + vy[i] * dt
+            if yi >= area_size:
+                yi -= area_size
+            elif yi < 0.0:
+                yi += area_size
+            y[i] = yi
+            if turn_draws[i] < turn_probability:
+                direction[i] = new_directions[i]
+                vx[i] = speed[i] * np.cos(new_directions[i])
+                vy[i] = speed[i] * np.sin(new_directions[i])
+
+        # Distance is symmetric, so test each unordered pair once and write both
+        # directions
+        r2 = radius * radius
+        count = 0
+        for i in range(n):
+            for j in range(i + 1, n):
+                dx = x[i] - x[j]
+                dy = y[i] - y[j]
+                if dx * dx + dy * dy <= r2:
+                    pairs_i[count] = i
+                    pairs_j[count] = j
+                    pairs_i[count + 1] = j
+                    pairs_j[count + 1] = i
+                    count += 2
+        return count
+
+    def warm_up():
+        """Compile the kernels (or load them from Numba's cache) on a tiny input."""
+        pos = np.zeros(2)
+        pairs = np.empty(2, dtype=np.int64)
+        tick(pos.copy(), pos.copy(), pos.copy(), pos.copy(), pos.copy(), pos.copy(),
+             pos.copy(), pos.copy(), 0.1, 0.1, 1.0, 1.0, pairs, pairs.copy())
+else:
+    tick = None
+
+    def warm_up():
+        pass
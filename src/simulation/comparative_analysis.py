@@ -1,11 +1,19 @@
+import io
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from dataclasses import dataclass
-from typing import List, Dict, Any
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from dataclasses import dataclass, astuple
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
+try:
+    import orjson
+    HAVE_ORJSON = True
+except ImportError:
+    import json
+    HAVE_ORJSON = False
+
 @dataclass
 class SystemMetrics:
     """Metrics for a single VANET system"""
@@ -24,6 +32,11 @@ class SystemMetrics:
 class VANETComparativeAnalysis:
     """Comparative analysis of different VANET systems"""
     
+    # Weights of the metrics that make up a system's overall score
+    _WEIGHT_ATTRS = ('security_score', 'performance_score', 'visualization_score',
+                     'feature_completeness', 'user_experience', 'attack_detection_rate')
+    _WEIGHTS = np.array([0.25, 0.2, 0.15, 0.15, 0.15, 0.1], dtype=np.float64)
+    
     def __init__(self):
         self.systems: Dict[str, SystemMetrics] = {}
         self.baseline_metrics = {
@@ -54,6 +67,10 @@ class VANETComparativeAnalysis:
                 scalability_score=0.7
             )
         }
+        
+        # (fingerprint, result) of the last report and rendered plot
+        self._report_cache: Optional[Tuple[tuple, Dict[str, Any]]] = None
+        self._plot_cache: Optional[Tuple[tuple, bytes]] = None
     
     def add_system(self, metrics: SystemMetrics):
         """Add a new system to the comparison"""
@@ -61,22 +78,31 @@ class VANETComparativeAnalysis:
     
     def calculate_overall_score(self, metrics: SystemMetrics) -> float:
         """Calculate overall score for a system"""
-        weights = {
-            'security_score': 0.25,
-            'performance_score': 0.2,
-            'visualization_score': 0.15,
-            'feature_completeness': 0.15,
-            'user_experience': 0.15,
-            'attack_detection_rate': 0.1
-        }
-        
-        return sum(
-            getattr(metrics, metric) * weight
-            for metric, weight in weights.items()
+        values = np.fromiter(
+            (getattr(metrics, attr) for attr in self._WEIGHT_ATTRS),
+            dtype=np.float64, count=len(self._WEIGHT_ATTRS)
         )
+        return float(values @ self._WEIGHTS)
+    
+    def _overall_scores(self, systems: List[SystemMetrics]) -> np.ndarray:
+        """Overall scores of several systems in one matrix-vector product"""
+        return self._metric_matrix(systems, self._WEIGHT_ATTRS, np.float64) @ self._WEIGHTS
+    
+    def _fingerprint(self) -> tuple:
+        """Content key of every compared system; equal keys give equal reports and plots"""
+        all_systems = {**self.systems, **self.baseline_metrics}
+        return tuple((name, astuple(metrics)) for name, metrics in all_systems.items())
     
     def generate_comparison_report(self) -> Dict[str, Any]:
         """Generate a comprehensive comparison report"""
+        key = self._fingerprint()
+        if self._report_cache is None or self._report_cache[0] != key:
+            self._report_cache = (key, self._build_comparison_report())
+        
+        # Only the timestamp changes while the systems stay the same
+        return {**self._report_cache[1], 'timestamp': datetime.now().isoformat()}
+    
+    def _build_comparison_report(self) -> Dict[str, Any]:
         report = {
             'systems': {},
             'overall_scores': {},
@@ -87,7 +113,9 @@ class VANETComparativeAnalysis:
         # Add all systems including baselines
         all_systems = {**self.systems, **self.baseline_metrics}
         
-        for name, metrics in all_systems.items():
+        overall_scores = self._overall_scores(list(all_systems.values())).tolist()
+        
+        for (name, metrics), score in zip(all_systems.items(), overall_scores):
             report['systems'][name] = {
                 'security': metrics.security_score,
                 'performance': metrics.performance_score,
@@ -101,7 +129,7 @@ class VANETComparativeAnalysis:
                 'scalability': metrics.scalability_score
             }
             
-            report['overall_scores'][name] = self.calculate_overall_score(metrics)
+            report['overall_scores'][name] = score
         
         # Calculate comparative advantages
         for name, metrics in self.systems.items():
@@ -122,9 +150,37 @@ class VANETComparativeAnalysis:
         
         return report
     
-    def plot_comparison(self, save_path: str = None):
-        """Generate comparison plots"""
+    @staticmethod
+    def _metric_matrix(systems: List[SystemMetrics], metrics: List[str],
+                       dtype=np.float32) -> np.ndarray:
+        """Stack the given metrics of each system into a (systems, metrics) array"""
+        return np.array(
+            [[getattr(system, metric) for metric in metrics] for system in systems],
+            dtype=dtype
+        )
+    
+    def plot_comparison(self, save_path: str = None) -> io.BytesIO:
+        """Generate comparison plots, returned as a PNG buffer and saved to save_path if given"""
+        key = self._fingerprint()
+        if self._plot_cache is None or self._plot_cache[0] != key:
+            self._plot_cache = (key, self._render_comparison())
+        png = self._plot_cache[1]
+        
+        if save_path:
+            with open(save_path, 'wb') as f:
+                f.write(png)
+        return io.BytesIO(png)
+    
+    def _render_comparison(self) -> bytes:
+        # matplotlib is only needed here, so runs that never plot don't import it.
+        # Output is PNG only, so use the headless Agg backend
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        
         all_systems = {**self.systems, **self.baseline_metrics}
+        names = list(all_systems)
+        systems = list(all_systems.values())
         
         # Create figure with subplots
         fig, axes = plt.subplots(2, 2, figsize=(15, 12))
@@ -133,14 +189,13 @@ class VANETComparativeAnalysis:
         # Radar chart for main metrics
         metrics = ['security_score', 'performance_score', 'visualization_score', 
                   'feature_completeness', 'user_experience']
+        main_values = self._metric_matrix(systems, metrics)
         
         angles = np.linspace(0, 2*np.pi, len(metrics), endpoint=False)
         angles = np.concatenate((angles, [angles[0]]))  # close the plot
         
-        for name, system in all_systems.items():
-            values = [getattr(system, metric) for metric in metrics]
-            values = np.concatenate((values, [values[0]]))  # close the plot
-            axes[0, 0].plot(angles, values, label=name, marker='o')
+        for name, values in zip(names, main_values):
+            axes[0, 0].plot(angles, np.r_[values, values[0]], label=name, marker='o')  # close the plot
         
         axes[0, 0].set_xticks(angles[:-1])
         axes[0, 0].set_xticklabels(metrics)
@@ -150,12 +205,12 @@ class VANETComparativeAnalysis:
         # Bar chart for performance metrics
         perf_metrics = ['attack_detection_rate', 'message_delivery_rate', 
                        'average_latency', 'resource_usage', 'scalability_score']
+        perf_values = self._metric_matrix(systems, perf_metrics)
         
         x = np.arange(len(perf_metrics))
         width = 0.25
         
-        for idx, (name, system) in enumerate(all_systems.items()):
-            values = [getattr(system, metric) for metric in perf_metrics]
+        for idx, (name, values) in enumerate(zip(names, perf_values)):
             axes[0, 1].bar(x + idx*width, values, width, label=name)
         
         axes[0, 1].set_xticks(x + width)
@@ -164,19 +219,15 @@ class VANETComparativeAnalysis:
         axes[0, 1].legend()
         
         # Overall scores comparison
-        overall_scores = {
-            name: self.calculate_overall_score(system)
-            for name, system in all_systems.items()
-        }
+        overall_scores = self._overall_scores(systems)
         
-        axes[1, 0].bar(overall_scores.keys(), overall_scores.values())
+        axes[1, 0].bar(names, overall_scores)
         axes[1, 0].set_title('Overall System Scores')
         axes[1, 0].tick_params(axis='x', rotation=45)
         
-        # Resource usage vs Performance
-        for name, system in all_systems.items():
-            axes[1, 1].scatter(system.resource_usage, system.performance_score, 
-                             label=name, s=100)
+        # Resource usage vs Performance (columns taken from the matrices above)
+        for name, usage, performance in zip(names, perf_values[:, 3], main_values[:, 1]):
+            axes[1, 1].scatter(usage, performance, label=name, s=100)
         
         axes[1, 1].set_xlabel('Resource Usage')
         axes[1, 1].set_ylabel('Performance Score')
@@ -185,21 +236,67 @@ class VANETComparativeAnalysis:
         
         plt.tight_layout()
         
-        if save_path:
-            plt.savefig(save_path)
-        else:
-            plt.show()
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png')
+        plt.close(fig)
+        return buf.getvalue()
+    
+    def comparison_figure(self) -> go.Figure:
+        """Interactive Plotly version of the comparison plots"""
+        all_systems = {**self.systems, **self.baseline_metrics}
+        names = list(all_systems)
+        systems = list(all_systems.values())
+        
+        metrics = ['security_score', 'performance_score', 'visualization_score', 
+                  'feature_completeness', 'user_experience']
+        perf_metrics = ['attack_detection_rate', 'message_delivery_rate', 
+                       'average_latency', 'resource_usage', 'scalability_score']
+        main_values = self._metric_matrix(systems, metrics)
+        perf_values = self._metric_matrix(systems, perf_metrics)
+        
+        fig = make_subplots(
+            rows=2, cols=2,
+            specs=[[{'type': 'polar'}, {'type': 'xy'}], [{'type': 'xy'}, {'type': 'xy'}]],
+            subplot_titles=(
+                'Main Metrics Comparison',
+                'Performance Metrics',
+                'Overall System Scores',
+                'Resource Usage vs Performance'
+            )
+        )
+        
+        # One trace per system and panel, sharing a legend group
+        for name, main, perf in zip(names, main_values, perf_values):
+            fig.add_trace(go.Scatterpolar(r=np.r_[main, main[0]], theta=metrics + metrics[:1],
+                                          name=name, legendgroup=name), row=1, col=1)
+            fig.add_trace(go.Bar(x=perf_metrics, y=perf, name=name, legendgroup=name,
+                                 showlegend=False), row=1, col=2)
+        
+        fig.add_trace(go.Bar(x=names, y=self._overall_scores(systems), showlegend=False),
+                      row=2, col=1)
+        fig.add_trace(go.Scatter(x=perf_values[:, 3], y=main_values[:, 1], text=names,
+                                 mode='markers', marker=dict(size=12), showlegend=False),
+                      row=2, col=2)
+        
+        fig.update_layout(height=900, barmode='group', title_text='VANET Systems Comparison')
+        fig.update_xaxes(title_text='Resource Usage', row=2, col=2)
+        fig.update_yaxes(title_text='Performance Score', row=2, col=2)
+        return fig
     
     def export_report(self, format: str = 'json', filepath: str = None):
         """Export the comparison report in specified format"""
         report = self.generate_comparison_report()
         
         if format == 'json':
-            import json
+            # orjson encodes straight to UTF-8 bytes, skipping the intermediate str
+            if HAVE_ORJSON:
+                data = orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+            else:
+                data = json.dumps(report, indent=2, ensure_ascii=False).encode()
             if filepath:
-                with open(filepath, 'w') as f:
-                    json.dump(report, f, indent=4)
-            return json.dumps(report, indent=4)
+                with open(filepath, 'wb') as f:
+                    f.write(data)
+            return data.decode()
         
         elif format == 'csv':
             import pandas as pd
@@ -5,7 +5,6 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.simulation.vanet_sim import VANETSimulation, SimulationConfig
-import matplotlib.pyplot as plt
 import json
 
 def main():
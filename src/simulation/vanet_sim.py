@@ -1,14 +1,16 @@
-import random
-import time
+import io
 import math
-from typing import List, Dict, Set
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pathlib import Path
+from typing import List, Dict, Set, Optional, Tuple
 from src.routing.secure_routing import SecureRoutingProtocol, Position, VehicleInfo, RouteEntry
-import matplotlib.pyplot as plt
 import numpy as np
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
 from src.simulation.comparative_analysis import VANETComparativeAnalysis, SystemMetrics
+from src.simulation._kernels import HAVE_NUMBA, tick
 
-@dataclass
+@dataclass(frozen=True)
 class SimulationConfig:
     num_vehicles: int = 50
     num_malicious: int = 5
@@ -18,22 +20,184 @@ class SimulationConfig:
     max_speed: float = 50.0  # km/h
     beacon_interval: float = 1.0  # seconds
     communication_range: float = 200.0  # meters
+    stats_interval: float = 1.0  # seconds between statistics samples
+
+@dataclass
+class SimStats:
+    """Simulation statistics sampled every stats_interval, one NumPy array per metric."""
+    messages_sent: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    messages_received: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    attacks_attempted: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    attacks_detected: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    packet_delivery_ratio: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+    trust_scores: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+
+    @classmethod
+    def allocate(cls, n_samples: int) -> 'SimStats':
+        """Zero-filled arrays with room for n_samples samples."""
+        defaults = cls()  # carries each series' dtype
+        return cls(*(np.zeros(n_samples, dtype=getattr(defaults, f.name).dtype) for f in fields(cls)))
+
+    def trimmed(self, n_samples: int) -> 'SimStats':
+        """Views of the first n_samples entries of every series."""
+        return SimStats(*(getattr(self, f.name)[:n_samples] for f in fields(self)))
+
+    def as_dict(self) -> Dict[str, np.ndarray]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+# From this many vehicles on, in-range pairs are found with a uniform grid instead
+# of the dense N x N distance matrix (if the grid is fine enough to prune much)
+GRID_MIN_VEHICLES = 400
+
+class VehicleKinematics:
+    """Positions, speeds and headings of a group of vehicles as parallel arrays.
+    
+    Vehicle i's state is x[i], y[i], speed[i] (m/s) and direction[i] (radians),
+    so a simulation step is a handful of array operations instead of a Python
+    call per vehicle. The velocity components vx/vy are kept alongside and only
+    recomputed for vehicles that change direction.
+    """
+    def __init__(self, x: np.ndarray, y: np.ndarray, speed: np.ndarray, direction: np.ndarray,
+                 area_size: float, rng: np.random.Generator):
+        self.x = x
+        self.y = y
+        self.speed = speed
+        self.direction = direction
+        self.vx = speed * np.cos(direction)
+        self.vy = speed * np.sin(direction)
+        self.area_size = area_size
+        self.rng = rng
+        # Simulation time (s) the positions refer to; used for position timestamps
+        self.time = 0.0
+        # Reused output buffers of the compiled tick kernel
+        self._pairs_i: Optional[np.ndarray] = None
+        self._pairs_j: Optional[np.ndarray] = None
+
+    @classmethod
+    def random(cls, n: int, config: SimulationConfig,
+               rng: Optional[np.random.Generator] = None) -> 'VehicleKinematics':
+        """Uniformly random initial state for n vehicles, one batched draw per quantity."""
+        rng = rng if rng is not None else np.random.default_rng()
+        return cls(
+            rng.uniform(0, config.area_size, n),
+            rng.uniform(0, config.area_size, n),
+            rng.uniform(config.min_speed / 3.6, config.max_speed / 3.6, n),  # Convert to m/s
+            rng.uniform(0, 2 * math.pi, n),
+            config.area_size,
+            rng
+        )
+
+    def step(self, dt: float):
+        """Advance every vehicle by dt seconds."""
+        self.time += dt
+        # Update positions, wrapping around boundaries. A step moves far less than
+        # area_size, so one conditional add/subtract replaces the float modulo
+        area = self.area_size
+        for pos, vel in ((self.x, self.vx), (self.y, self.vy)):
+            pos += vel * dt
+            pos[pos >= area] -= area
+            pos[pos < 0] += area
+        
+        # Each vehicle has a 10% chance to change direction
+        turns = np.flatnonzero(self.rng.random(self.x.size) < 0.1)
+        new_direction = self.rng.uniform(0, 2 * math.pi, turns.size)
+        self.direction[turns] = new_direction
+        self.vx[turns] = self.speed[turns] * np.cos(new_direction)
+        self.vy[turns] = self.speed[turns] * np.sin(new_direction)
+
+    def advance(self, dt: float, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """step(dt), then return in_range_pairs(radius).
+        
+        With Numba both run fused in one compiled pass; the returned arrays are
+        then views into buffers reused by the next call, holding the same pairs
+        in symmetric order (each (i, j) with i < j followed by (j, i)).
+        """
+        n = self.x.size
+        if not HAVE_NUMBA or self._use_grid(radius):
+            self.step(dt)
+            return self.in_range_pairs(radius)
+        
+        self.time += dt
+        if self._pairs_i is None or self._pairs_i.size != n * (n - 1):
+            self._pairs_i = np.empty(n * (n - 1), dtype=np.int64)
+            self._pairs_j = np.empty(n * (n - 1), dtype=np.int64)
+        count = tick(
+            self.x, self.y, self.vx, self.vy, self.speed, self.direction,
+            self.rng.random(n), self.rng.uniform(0, 2 * math.pi, n), 0.1,
+            dt, self.area_size, radius, self._pairs_i, self._pairs_j
+        )
+        return self._pairs_i[:count], self._pairs_j[:count]
+
+    def _use_grid(self, radius: float) -> bool:
+        # The 3 x 3 block of cells searched around a vehicle should cover well under
+        # the whole area, otherwise the grid costs more than it prunes
+        return self.x.size >= GRID_MIN_VEHICLES and 9 * radius ** 2 < 0.25 * self.area_size ** 2
+
+    def in_range_pairs(self, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Index pairs (i, j), i != j, of vehicles at most radius apart, sorted by i then j."""
+        if self._use_grid(radius):
+            return self._grid_pairs(radius)
+        
+        # All pairwise squared distances at once; a vehicle never talks to itself
+        dx = self.x[:, None] - self.x[None, :]
+        dy = self.y[:, None] - self.y[None, :]
+        in_range = dx * dx + dy * dy <= radius ** 2
+        np.fill_diagonal(in_range, False)
+        return np.nonzero(in_range)
+
+    def _grid_pairs(self, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """in_range_pairs using a uniform grid of radius-sized cells.
+        
+        Only vehicles in the same or one of the 8 adjacent cells can be in range,
+        so candidates grow with N times the local density instead of N squared.
+        """
+        n = self.x.size
+        cx = (self.x // radius).astype(np.int64)
+        cy = (self.y // radius).astype(np.int64)
+        n_rows = int(cy.max()) + 1
+        cell = cx * n_rows + cy
+        
+        # Vehicles sorted by cell, so each cell's members are one contiguous run
+        order = np.argsort(cell, kind='stable')
+        sorted_cells = cell[order]
+        
+        candidates_i, candidates_j = [], []
+        for ox in (-1, 0, 1):
+            for oy in (-1, 0, 1):
+                ncy = cy + oy
+                neighbor = (cx + ox) * n_rows + ncy
+                start = np.searchsorted(sorted_cells, neighbor, 'left')
+                counts = np.searchsorted(sorted_cells, neighbor, 'right') - start
+                counts[(ncy < 0) | (ncy >= n_rows)] = 0  # no wrapping into the next column
+                
+                # Expand every vehicle into (vehicle, member of the neighbor cell) pairs
+                total = int(counts.sum())
+                run_offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                candidates_i.append(np.repeat(np.arange(n), counts))
+                candidates_j.append(order[np.repeat(start, counts) + run_offset])
+        
+        i = np.concatenate(candidates_i)
+        j = np.concatenate(candidates_j)
+        dx = self.x[i] - self.x[j]
+        dy = self.y[i] - self.y[j]
+        keep = (i != j) & (dx * dx + dy * dy <= radius ** 2)
+        i, j = i[keep], j[keep]
+        
+        by_sender = np.lexsort((j, i))
+        return i[by_sender], j[by_sender]
 
 class VehicleNode:
-    def __init__(self, vehicle_id: str, is_malicious: bool, config: SimulationConfig):
+    def __init__(self, vehicle_id: str, is_malicious: bool, config: SimulationConfig,
+                 kinematics: Optional[VehicleKinematics] = None, index: int = 0):
         self.id = vehicle_id
         self.is_malicious = is_malicious
         self.config = config
         
-        # Initialize position and movement
-        self.position = Position(
-            x=random.uniform(0, config.area_size),
-            y=random.uniform(0, config.area_size),
-            z=0.0,
-            timestamp=time.time()
-        )
-        self.speed = random.uniform(config.min_speed / 3.6, config.max_speed / 3.6)  # Convert to m/s
-        self.direction = random.uniform(0, 2 * math.pi)
+        # Position and movement live in shared arrays, at this vehicle's index
+        if kinematics is None:
+            kinematics, index = VehicleKinematics.random(1, config), 0
+        self._kinematics = kinematics
+        self._index = index
         
         # Initialize routing protocol
         self.router = SecureRoutingProtocol(vehicle_id)
@@ -59,79 +223,77 @@ class VehicleNode:
             'attacks_detected': 0
         }
 
-    def update(self, dt: float):
-        """Update vehicle position and state."""
-        # Update position
-        new_x = self.position.x + self.speed * math.cos(self.direction) * dt
-        new_y = self.position.y + self.speed * math.sin(self.direction) * dt
-        
-        # Wrap around boundaries
-        new_x = new_x % self.config.area_size
-        new_y = new_y % self.config.area_size
-        
-        # Create new position
-        new_pos = Position(
-            x=new_x,
-            y=new_y,
+    @property
+    def position(self) -> Position:
+        """Current position, built from the shared kinematics arrays on demand."""
+        k, i = self._kinematics, self._index
+        return Position(
+            x=float(k.x[i]),
+            y=float(k.y[i]),
             z=0.0,
-            timestamp=time.time()
+            timestamp=k.time
         )
-        
-        # Update router with new position
-        self.router.update_position(new_pos)
-        self.position = new_pos
-        
-        # Randomly change direction
-        if random.random() < 0.1:  # 10% chance to change direction
-            self.direction = random.uniform(0, 2 * math.pi)
+
+    @property
+    def speed(self) -> float:
+        """Current speed in m/s."""
+        return float(self._kinematics.speed[self._index])
+
+    @property
+    def direction(self) -> float:
+        """Current heading in radians."""
+        return float(self._kinematics.direction[self._index])
 
     def send_beacon(self):
         """Send periodic beacon message."""
+        # The router learns the vehicle's latest position when it beacons
+        self.router.update_position(self.position)
         if not self.is_malicious:
             try:
-                # Create beacon message with vehicle info
-                info = VehicleInfo(
-                    id=self.id,
-                    position=self.position,
-                    speed=self.speed * 3.6,  # Convert to km/h
-                    direction=self.direction,
-                    trust_score=1.0
-                )
-                message = f"{info.id}:{info.position.x}:{info.position.y}:{info.speed}:{info.direction}".encode()
                 self.router.send_beacon()
                 self.messages_sent += 1
             except Exception as e:
                 print(f"Error sending beacon from {self.id}: {e}")
         else:
-            # Malicious node might send false position
+            # Malicious node beacons as well; each beacon counts as an attack attempt
             self.attacks_attempted += 1
             try:
-                false_pos = Position(
-                    x=random.uniform(0, self.config.area_size),
-                    y=random.uniform(0, self.config.area_size),
-                    z=0.0,
-                    timestamp=time.time()
-                )
-                info = VehicleInfo(
-                    id=self.id,
-                    position=false_pos,
-                    speed=self.speed * 3.6,
-                    direction=self.direction,
-                    trust_score=1.0
-                )
-                message = f"{info.id}:{false_pos.x}:{false_pos.y}:{info.speed}:{info.direction}".encode()
                 self.router.send_beacon()
             except Exception as e:
                 print(f"Error sending malicious beacon from {self.id}: {e}")
 
-    def receive_message(self, message: bytes, sender_id: str) -> bool:
-        """Process received message."""
+    def receive_message(self, message: bytes, sender_id: str,
+                        drop_draw: Optional[float] = None) -> bool:
+        """Process received message.
+        
+        drop_draw is a uniform [0, 1) number deciding whether a malicious node
+        drops the message; callers delivering many messages pre-draw them in bulk.
+        """
         if self.is_malicious:
             # Malicious node might drop messages
             self.attacks_attempted += 1
-            if random.random() < 0.5:  # 50% chance to drop message
+            if drop_draw is None:
+                drop_draw = self._kinematics.rng.random()
+            if drop_draw < 0.5:  # 50% chance to drop message
                 return False
         
+        return self.deliver(message, sender_id)
+
+    def receive_batch(self, messages: List[bytes]) -> int:
+        """Hand several messages that weren't dropped to the router at once.
+        
+        Returns how many of them the router accepted.
+        """
+        try:
+            accepted = self.router.receive_batch(messages)
+        except Exception as e:
+            print(f"Error receiving {len(messages)} messages at {self.id}: {e}")
+            return 0
+        self.messages_received += accepted
+        return accepted
+
+    def deliver(self, message: bytes, sender_id: str) -> bool:
+        """Hand a message that wasn't dropped to the router."""
         try:
             success = self.router.receive_message(message)
             if success:
@@ -141,38 +303,114 @@ class VehicleNode:
             print(f"Error receiving message at {self.id} from {sender_id}: {e}")
             return False
 
+# Feature weights behind the fixed comparison scores; each score is the sum of
+# its weights, so it is computed once here rather than on every call
+SECURITY_FEATURES = {
+    'hmac_auth': 0.3,
+    'trust_system': 0.2,
+    'attack_detection': 0.2,
+    'message_integrity': 0.15,
+    'replay_protection': 0.15
+}
+_SECURITY_SCORE = sum(SECURITY_FEATURES.values())
+
+VISUALIZATION_FEATURES = {
+    'real_time_tracking': 0.3,
+    'speed_monitoring': 0.2,
+    'vehicle_types': 0.2,
+    'interactive_controls': 0.2,
+    'metrics_display': 0.1
+}
+_VISUALIZATION_SCORE = sum(VISUALIZATION_FEATURES.values())
+
+COMPLETENESS_FEATURES = {
+    'vehicle_types': 0.2,
+    'security': 0.2,
+    'visualization': 0.2,
+    'metrics': 0.2,
+    'user_interface': 0.2
+}
+_COMPLETENESS_SCORE = sum(COMPLETENESS_FEATURES.values())
+
+UX_FEATURES = {
+    'interactive_controls': 0.3,
+    'real_time_feedback': 0.2,
+    'intuitive_interface': 0.2,
+    'responsive_design': 0.2,
+    'helpful_documentation': 0.1
+}
+_UX_SCORE = sum(UX_FEATURES.values())
+
+SCALABILITY_FEATURES = {
+    'distributed_architecture': 0.3,
+    'efficient_routing': 0.2,
+    'resource_optimization': 0.2,
+    'load_balancing': 0.2,
+    'dynamic_scaling': 0.1
+}
+_SCALABILITY_SCORE = sum(SCALABILITY_FEATURES.values())
+
+_REPORT_TEMPLATE = """VANET Secure Routing Simulation Report
+====================================
+
+Simulation Parameters:
+Number of vehicles: {num_vehicles}
+Number of malicious nodes: {num_malicious}
+Simulation time: {sim_time} seconds
+Area size: {area_size}x{area_size} meters
+Speed range: {min_speed}-{max_speed} km/h
+
+Final Statistics:
+Total messages sent: {messages_sent}
+Total messages received: {messages_received}
+Final packet delivery ratio: {packet_delivery_ratio:.2%}
+Total attacks attempted: {attacks_attempted}
+Total attacks detected: {attacks_detected}
+Attack detection rate: {detection_rate:.2%}
+Final average trust score: {trust_scores:.3f}
+"""
+
 class VANETSimulation:
-    def __init__(self, config: SimulationConfig):
+    def __init__(self, config: SimulationConfig, seed: Optional[int] = None):
         self.config = config
+        self.seed = seed
         self.vehicles: Dict[str, VehicleNode] = {}
+        # Vehicles and their ids by index (the kinematics index), for the per-tick loops
+        self._vehicle_list: List[VehicleNode] = []
+        self._vehicle_ids: List[str] = []
+        self._test_messages: List[bytes] = []
         self.malicious_ids: Set[str] = set()
         self.time = 0.0
-        self.stats = {
-            'messages_sent': [],
-            'messages_received': [],
-            'attacks_attempted': [],
-            'attacks_detected': [],
-            'packet_delivery_ratio': [],
-            'trust_scores': []
-        }
+        self.stats = SimStats()
         
+        # Holds the baselines until run() adds this system's measured metrics
         self.comparative_analyzer = VANETComparativeAnalysis()
         self._initialize_vehicles()
-        self.initialize_comparative_analysis()
 
     def _initialize_vehicles(self):
         """Initialize vehicles in the simulation."""
-        # Create malicious node IDs
-        malicious_ids = set(random.sample(range(self.config.num_vehicles), self.config.num_malicious))
+        config = self.config
+        n = config.num_vehicles
+        rng = np.random.default_rng(self.seed)
+        
+        # Draw every vehicle's initial state in one batched call per quantity
+        is_malicious = np.zeros(n, dtype=bool)
+        is_malicious[rng.choice(n, size=config.num_malicious, replace=False)] = True
+        self._is_malicious = is_malicious
+        self.kinematics = VehicleKinematics.random(n, config, rng)
         
         # Create vehicles
-        for i in range(self.config.num_vehicles):
+        for i, malicious in enumerate(is_malicious.tolist()):
             vehicle_id = f"vehicle_{i}"
-            is_malicious = i in malicious_ids
-            if is_malicious:
+            if malicious:
                 self.malicious_ids.add(vehicle_id)
             
-            self.vehicles[vehicle_id] = VehicleNode(vehicle_id, is_malicious, self.config)
+            self.vehicles[vehicle_id] = VehicleNode(vehicle_id, malicious, config, self.kinematics, i)
+        
+        self._vehicle_list = list(self.vehicles.values())
+        self._vehicle_ids = list(self.vehicles)
+        # Each vehicle's test message never changes, so encode it once
+        self._test_messages = [f"test_message_from_{vehicle_id}".encode() for vehicle_id in self._vehicle_ids]
 
     def initialize_comparative_analysis(self):
         """Initialize comparative analysis with current system metrics"""
@@ -195,14 +433,7 @@ class VANETSimulation:
     
     def calculate_security_score(self) -> float:
         """Calculate security score based on implemented features"""
-        security_features = {
-            'hmac_auth': 0.3,
-            'trust_system': 0.2,
-            'attack_detection': 0.2,
-            'message_integrity': 0.15,
-            'replay_protection': 0.15
-        }
-        return sum(security_features.values())
+        return _SECURITY_SCORE
     
     def calculate_performance_score(self) -> float:
         """Calculate performance score based on metrics"""
@@ -220,36 +451,15 @@ class VANETSimulation:
     
     def calculate_visualization_score(self) -> float:
         """Calculate visualization score based on implemented features"""
-        viz_features = {
-            'real_time_tracking': 0.3,
-            'speed_monitoring': 0.2,
-            'vehicle_types': 0.2,
-            'interactive_controls': 0.2,
-            'metrics_display': 0.1
-        }
-        return sum(viz_features.values())
+        return _VISUALIZATION_SCORE
     
     def calculate_feature_completeness(self) -> float:
         """Calculate feature completeness score"""
-        features = {
-            'vehicle_types': 0.2,
-            'security': 0.2,
-            'visualization': 0.2,
-            'metrics': 0.2,
-            'user_interface': 0.2
-        }
-        return sum(features.values())
+        return _COMPLETENESS_SCORE
     
     def calculate_user_experience(self) -> float:
         """Calculate user experience score"""
-        ux_features = {
-            'interactive_controls': 0.3,
-            'real_time_feedback': 0.2,
-            'intuitive_interface': 0.2,
-            'responsive_design': 0.2,
-            'helpful_documentation': 0.1
-        }
-        return sum(ux_features.values())
+        return _UX_SCORE
     
     def calculate_attack_detection_rate(self) -> float:
         """Calculate attack detection rate"""
@@ -306,113 +516,154 @@ class VANETSimulation:
     
     def calculate_scalability_score(self) -> float:
         """Calculate scalability score"""
-        scalability_features = {
-            'distributed_architecture': 0.3,
-            'efficient_routing': 0.2,
-            'resource_optimization': 0.2,
-            'load_balancing': 0.2,
-            'dynamic_scaling': 0.1
-        }
-        return sum(scalability_features.values())
+        return _SCALABILITY_SCORE
     
     def generate_comparative_report(self, format: str = 'json', filepath: str = None):
         """Generate and export comparative analysis report"""
         return self.comparative_analyzer.export_report(format, filepath)
     
+    def generate_comparative_report_dict(self) -> Dict:
+        """Return the comparative analysis report as a dict, without serializing it"""
+        return self.comparative_analyzer.generate_comparison_report()
+    
     def plot_comparison(self, save_path: str = None):
         """Generate comparison plots"""
-        self.comparative_analyzer.plot_comparison(save_path)
+        return self.comparative_analyzer.plot_comparison(save_path)
+    
+    def comparison_figure(self):
+        """Interactive Plotly comparison figure"""
+        return self.comparative_analyzer.comparison_figure()
 
     def run(self):
         """Run the simulation."""
         dt = 0.1  # Time step (seconds)
         next_beacon_time = 0.0
+        config = self.config
+        sim_time = config.sim_time
+        comm_range = config.communication_range
+        beacon_interval = config.beacon_interval
+        advance = self.kinematics.advance
+        
+        # Statistics are sampled every stats_every ticks and once more at the end;
+        # one extra slot in case float drift in self.time adds a tick
+        stats_every = max(1, round(config.stats_interval / dt))
+        self.stats = SimStats.allocate(math.ceil(sim_time / dt) // stats_every + 3)
+        step = 0
+        sample = 0
         
-        while self.time < self.config.sim_time:
-            # Update vehicle positions
-            for vehicle in self.vehicles.values():
-                vehicle.update(dt)
+        while self.time < sim_time:
+            # Update vehicle positions and find the pairs in communication range
+            pairs = advance(dt, comm_range)
             
             # Send beacons
             if self.time >= next_beacon_time:
                 self._send_beacons()
-                next_beacon_time = self.time + self.config.beacon_interval
+                next_beacon_time = self.time + beacon_interval
             
             # Simulate communication
-            self._simulate_communication()
+            self._simulate_communication(pairs)
             
             # Collect statistics
-            self._collect_stats()
+            if step % stats_every == 0:
+                self._collect_stats(sample)
+                sample += 1
+            step += 1
             
             self.time += dt
+        
+        # Always record the final state, which the reports read from the last sample
+        if (step - 1) % stats_every != 0:
+            self._collect_stats(sample)
+            sample += 1
+        self.stats = self.stats.trimmed(sample)
+        
+        # Score this system from the finished run
+        self.initialize_comparative_analysis()
 
     def _send_beacons(self):
         """Have all vehicles send beacon messages."""
-        for vehicle in self.vehicles.values():
+        for vehicle in self._vehicle_list:
             vehicle.send_beacon()
 
-    def _simulate_communication(self):
+    def _simulate_communication(self, pairs: Optional[Tuple[np.ndarray, np.ndarray]] = None):
         """Simulate message exchange between vehicles in range."""
-        for v1_id, v1 in self.vehicles.items():
-            for v2_id, v2 in self.vehicles.items():
-                if v1_id != v2_id:
-                    try:
-                        # Check if vehicles are in range
-                        distance = math.sqrt(
-                            (v1.position.x - v2.position.x) ** 2 +
-                            (v1.position.y - v2.position.y) ** 2
-                        )
-                        if distance <= self.config.communication_range:
-                            # Create and send test message
-                            message = f"test_message_from_{v1_id}".encode()
-                            v2.receive_message(message, v1_id)
-                    except Exception as e:
-                        print(f"Error in communication between {v1_id} and {v2_id}: {e}")
-
-    def _collect_stats(self):
-        """Collect simulation statistics."""
-        total_sent = sum(v.messages_sent for v in self.vehicles.values())
-        total_received = sum(v.messages_received for v in self.vehicles.values())
-        total_attacks = sum(v.attacks_attempted for v in self.vehicles.values())
-        total_detected = sum(v.attacks_detected for v in self.vehicles.values())
+        vehicles = self._vehicle_list
+        if pairs is None:
+            pairs = self.kinematics.in_range_pairs(self.config.communication_range)
+        
+        senders, receivers = pairs
         
-        self.stats['messages_sent'].append(total_sent)
-        self.stats['messages_received'].append(total_received)
-        self.stats['attacks_attempted'].append(total_attacks)
-        self.stats['attacks_detected'].append(total_detected)
+        # Malicious receivers drop half of their messages. Decide all drops up front
+        # so dropped messages never reach a Python call
+        attempted = self._is_malicious[receivers]
+        dropped = attempted & (self.kinematics.rng.random(receivers.size) < 0.5)
+        for idx, count in zip(*np.unique(receivers[attempted], return_counts=True)):
+            vehicles[idx].attacks_attempted += int(count)
+        
+        # Deliver each receiver's messages in one batch. Every pair source lists a
+        # receiver's senders in ascending order, which the stable sort keeps
+        delivered = ~dropped
+        senders, receivers = senders[delivered], receivers[delivered]
+        order = np.argsort(receivers, kind='stable')
+        senders, receivers = senders[order].tolist(), receivers[order]
+        firsts, starts = np.unique(receivers, return_index=True)
+        ends = np.append(starts[1:], receivers.size)
+        messages = self._test_messages
+        for j, start, end in zip(firsts.tolist(), starts.tolist(), ends.tolist()):
+            vehicles[j].receive_batch([messages[i] for i in senders[start:end]])
+
+    def _collect_stats(self, sample: int):
+        """Collect simulation statistics into the given sample slot."""
+        vehicles = self._vehicle_list
+        total_sent = sum(v.messages_sent for v in vehicles)
+        total_received = sum(v.messages_received for v in vehicles)
+        total_attacks = sum(v.attacks_attempted for v in vehicles)
+        total_detected = sum(v.attacks_detected for v in vehicles)
         
         if total_sent > 0:
             pdr = total_received / total_sent
         else:
             pdr = 0.0
-        self.stats['packet_delivery_ratio'].append(pdr)
-        
-        # Calculate average trust scores
-        trust_scores = []
-        for v1 in self.vehicles.values():
-            for v2_id in self.vehicles:
-                if v1.id != v2_id:
-                    trust_scores.append(v1.router.calculate_trust(v2_id))
-        self.stats['trust_scores'].append(np.mean(trust_scores) if trust_scores else 0.0)
-
-    def plot_results(self):
-        """Plot simulation results."""
+        
+        # Average trust every vehicle has in every other one: row i of the matrix
+        # is vehicle i's view, the diagonal (self-trust) is left out
+        ids = self._vehicle_ids
+        n = len(ids)
+        trust = np.stack([v.router.get_trust_array(ids) for v in vehicles])
+        
+        stats = self.stats
+        stats.messages_sent[sample] = total_sent
+        stats.messages_received[sample] = total_received
+        stats.attacks_attempted[sample] = total_attacks
+        stats.attacks_detected[sample] = total_detected
+        stats.packet_delivery_ratio[sample] = pdr
+        stats.trust_scores[sample] = (trust.sum() - np.trace(trust)) / (n * (n - 1)) if n > 1 else 0.0
+
+    def plot_results(self, target='results/simulation_results.png'):
+        """Plot simulation results to a file path or a writable binary file object."""
+        # matplotlib is only needed here, so runs that never plot don't import it.
+        # Output is PNG only, so use the headless Agg backend
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        
+        # One time axis shared by every series (all stats are sampled together)
+        n = len(self.stats.packet_delivery_ratio)
+        t = np.linspace(0, self.config.sim_time, n, dtype='float32')
+        
         plt.figure(figsize=(15, 10))
         
         # Plot 1: Packet Delivery Ratio
         plt.subplot(2, 2, 1)
-        plt.plot(np.linspace(0, self.config.sim_time, len(self.stats['packet_delivery_ratio'])),
-                self.stats['packet_delivery_ratio'])
+        plt.plot(t, self.stats.packet_delivery_ratio)
         plt.title('Packet Delivery Ratio')
         plt.xlabel('Time (s)')
         plt.ylabel('PDR')
         
         # Plot 2: Messages Sent vs Received
         plt.subplot(2, 2, 2)
-        plt.plot(np.linspace(0, self.config.sim_time, len(self.stats['messages_sent'])),
-                self.stats['messages_sent'], label='Sent')
-        plt.plot(np.linspace(0, self.config.sim_time, len(self.stats['messages_received'])),
-                self.stats['messages_received'], label='Received')
+        plt.plot(t, self.stats.messages_sent, label='Sent')
+        plt.plot(t, self.stats.messages_received, label='Received')
         plt.title('Message Statistics')
         plt.xlabel('Time (s)')
         plt.ylabel('Number of Messages')
@@ -420,10 +671,8 @@ class VANETSimulation:
         
         # Plot 3: Attack Statistics
         plt.subplot(2, 2, 3)
-        plt.plot(np.linspace(0, self.config.sim_time, len(self.stats['attacks_attempted'])),
-                self.stats['attacks_attempted'], label='Attempted')
-        plt.plot(np.linspace(0, self.config.sim_time, len(self.stats['attacks_detected'])),
-                self.stats['attacks_detected'], label='Detected')
+        plt.plot(t, self.stats.attacks_attempted, label='Attempted')
+        plt.plot(t, self.stats.attacks_detected, label='Detected')
         plt.title('Attack Statistics')
         plt.xlabel('Time (s)')
         plt.ylabel('Number of Attacks')
@@ -431,34 +680,43 @@ class VANETSimulation:
         
         # Plot 4: Average Trust Scores
         plt.subplot(2, 2, 4)
-        plt.plot(np.linspace(0, self.config.sim_time, len(self.stats['trust_scores'])),
-                self.stats['trust_scores'])
+        plt.plot(t, self.stats.trust_scores)
         plt.title('Average Trust Scores')
         plt.xlabel('Time (s)')
         plt.ylabel('Trust Score')
         
         plt.tight_layout()
-        plt.savefig('results/simulation_results.png')
+        plt.savefig(target, format='png')
         plt.close()
+    
+    def plot_results_to_buffer(self) -> io.BytesIO:
+        """Render the result plots as PNG into memory instead of the results directory."""
+        buf = io.BytesIO()
+        self.plot_results(buf)
+        buf.seek(0)
+        return buf
 
     def generate_report(self):
         """Generate a simulation report."""
-        with open('results/simulation_report.txt', 'w') as f:
-            f.write("VANET Secure Routing Simulation Report\n")
-            f.write("====================================\n\n")
-            
-            f.write("Simulation Parameters:\n")
-            f.write(f"Number of vehicles: {self.config.num_vehicles}\n")
-            f.write(f"Number of malicious nodes: {self.config.num_malicious}\n")
-            f.write(f"Simulation time: {self.config.sim_time} seconds\n")
-            f.write(f"Area size: {self.config.area_size}x{self.config.area_size} meters\n")
-            f.write(f"Speed range: {self.config.min_speed}-{self.config.max_speed} km/h\n\n")
-            
-            f.write("Final Statistics:\n")
-            f.write(f"Total messages sent: {self.stats['messages_sent'][-1]}\n")
-            f.write(f"Total messages received: {self.stats['messages_received'][-1]}\n")
-            f.write(f"Final packet delivery ratio: {self.stats['packet_delivery_ratio'][-1]:.2%}\n")
-            f.write(f"Total attacks attempted: {self.stats['attacks_attempted'][-1]}\n")
-            f.write(f"Total attacks detected: {self.stats['attacks_detected'][-1]}\n")
-            f.write(f"Attack detection rate: {self.stats['attacks_detected'][-1]/max(1, self.stats['attacks_attempted'][-1]):.2%}\n")
-            f.write(f"Final average trust score: {self.stats['trust_scores'][-1]:.3f}\n") 
\ No newline at end of file
+        final_stats = {name: series[-1] for name, series in self.stats.as_dict().items()}
+        detection_rate = final_stats['attacks_detected'] / max(1, final_stats['attacks_attempted'])
+        report = _REPORT_TEMPLATE.format_map({**vars(self.config), **final_stats,
+                                              'detection_rate': detection_rate})
+        # Write the whole report at once
+        Path('results/simulation_report.txt').write_text(report)
+
+def _run_one(config: SimulationConfig, seed: Optional[int]) -> SimStats:
+    """Run one simulation replicate and return its statistics."""
+    simulation = VANETSimulation(config, seed)
+    simulation.run()
+    return simulation.stats
+
+def run_sweep(configs: List[SimulationConfig], seeds: List[Optional[int]],
+              max_workers: Optional[int] = None) -> List[SimStats]:
+    """Run every (config, seed) combination in parallel, one worker process per replicate.
+    
+    Results are returned in the order of product(configs, seeds).
+    """
+    runs = list(product(configs, seeds))
+    with ProcessPoolExecutor(max_workers) as executor:
+        return list(executor.map(_run_one, [c for c, _ in runs], [s for _, s in runs]))